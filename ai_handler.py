@@ -1,13 +1,361 @@
 # ai_handler.py - Module pour gérer les appels OpenAI
 import os
-import json
+import asyncio
+import functools
 import logging
-from typing import List, Dict
-from openai import OpenAI
+import random
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, List, Dict, Optional, Tuple
 
-logging.basicConfig(level=logging.INFO)
+import httpx
+import numpy as np
+from openai import (
+    APIConnectionError, APIStatusError, AsyncOpenAI, InternalServerError, RateLimitError
+)
+
+try:
+    import orjson
+    JSONDecodeError = orjson.JSONDecodeError
+except ImportError:  # Fallback si orjson n'est pas installé
+    import json
+    orjson = None
+    JSONDecodeError = json.JSONDecodeError
+
+try:
+    import simdjson
+except ImportError:  # Optionnel: on retombe sur orjson / json
+    simdjson = None
+
+# Ne pas écraser la configuration de l'application hôte (uvicorn, tests...)
+if not logging.getLogger().handlers:
+    logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _loads(data):
+    """Parser du JSON (str ou bytes) avec orjson si disponible"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _dumps(obj) -> bytes:
+    """Sérialiser en JSON compact (bytes) avec orjson si disponible"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+# Nombre de commentaires envoyés par appel API (au-delà, le batch est découpé)
+BATCH_SIZE = int(os.getenv("OPENAI_BATCH_SIZE", "20"))
+
+# Nombre maximum d'appels OpenAI simultanés
+MAX_CONCURRENT_CALLS = int(os.getenv("OPENAI_MAX_CONCURRENT_CALLS", "32"))
+
+# Budget de tokens générés par commentaire
+MAX_TOKENS_PER_RESPONSE = 120
+
+# Nombre de nouvelles tentatives après une erreur 429 (rate limit)
+RATE_LIMIT_MAX_RETRIES = 5
+
+# Réponse utilisée quand l'IA n'a pas pu répondre (jamais mise en cache)
+DEFAULT_RESPONSE = "Merci pour ton commentaire"
+
+# Cache des réponses: correspondance exacte puis similarité sémantique
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.93"))
+SEMANTIC_CACHE_CONTEXTS = 128  # Nombre de vidéos (titre + hashtags) indexées
+# Plafond global des entrées sémantiques, toutes vidéos confondues (~6 Ko par entrée)
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "20000"))
+EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+
+# Bloc markdown ```json ... ``` autour de la réponse du modèle
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+
+# Marqueur remplaçant la salutation dans les réponses mises en cache
+_USERNAME_PLACEHOLDER = "\x00"
+
+# Salutation en début de réponse ("Coucou Fatima!", "Hello!", "Coucou ma belle,")
+_GREETING_RE = re.compile(
+    r"^(?:coucou|hello|salut|bonjour)(?P<name>(?:\s+[^\W\d_][\w'-]*){0,2})\s*[!?,.]+\s*",
+    re.IGNORECASE
+)
+_GREETING_WORD_RE = re.compile(r"^(?:coucou|hello|salut|bonjour)\b", re.IGNORECASE)
+_NAME_RE = re.compile(r"[^\W\d_]+")
+_MIN_NAME_LENGTH = 3  # Noms plus courts: salutation "Hello!"
+
+# Instructions statiques du prompt batch: identiques d'un appel à l'autre
+# (préfixe > 1024 tokens mis en cache par OpenAI)
+SYSTEM_PROMPT_BATCH = """Tu es Copywriter GPT, un copywriter chaleureux et empathique pour TikTok. Tu réponds aux commentaires sur les vidéos tiktok.
+
+Audience cible: Communauté
+Objectif: Créer de l'engagement authentique et chaleureux
+
+INSTRUCTIONS IMPORTANTES:
+- Réponds à chaque commentaire avec MAXIMUM 114 caractères
+- Commence par "Coucou [nom]" ou simplement "Hello" si le nom est long
+- Ton chaleureux, amical, comme une grande sœur bienveillante
+- Ne donne JAMAIS de conseils médicaux, juridiques ou religieux précis
+- Évite les questions ouvertes qui créent des débats
+- Reste positive, encourageante et authentique
+- Utilise des emojis appropriés mais avec modération
+
+RÈGLES DÉTAILLÉES:
+
+1. Longueur
+- La limite de 114 caractères inclut les espaces, la ponctuation et les emojis.
+- Préfère une phrase courte et naturelle à une phrase longue et coupée.
+- Ne termine jamais une réponse par des points de suspension pour gagner de la place.
+
+2. Salutation
+- Utilise le nom affiché de la personne, sans le "@" et sans les chiffres ou underscores de fin.
+- Si le nom dépasse 15 caractères, contient surtout des emojis ou n'est pas lisible, commence par "Hello".
+- N'invente jamais de prénom et ne devine pas le genre de la personne à partir de son nom.
+
+3. Ton et style
+- Parle comme une grande sœur bienveillante: simple, chaleureuse, jamais condescendante.
+- Tutoie toujours la personne.
+- Varie les formulations d'une réponse à l'autre: évite de répéter la même phrase dans le batch.
+- Maximum deux emojis par réponse, placés de préférence en fin de phrase.
+- Pas de hashtags, pas de liens, pas de mentions "@" d'autres comptes dans les réponses.
+- Réponds dans la langue du commentaire (français par défaut).
+
+4. Selon le type de commentaire
+- Compliment ou remerciement: remercie sincèrement et renvoie la gentillesse.
+- Question sur un produit ou un bon plan (où l'acheter, prix, référence): indique que les infos sont dans la vidéo ou en description, sans inventer de prix, de magasin ni de lien.
+- Expression religieuse (MashaAllah, Baraka Allahou fik, Amine...): réponds avec une formule naturelle et respectueuse équivalente, sans développer de point religieux.
+- Témoignage personnel: montre de l'empathie et de l'encouragement, sans juger.
+- Critique ou désaccord: reste calme et positive, remercie pour le retour, ne te justifie pas longuement.
+- Commentaire composé uniquement d'emojis: réponds brièvement avec un remerciement et un emoji.
+- Commentaire incompréhensible ou hors sujet: remercie simplement pour le passage.
+- Spam, insulte ou provocation: réponds de façon neutre et polie, sans reprendre les propos.
+
+5. Interdits
+- Aucun conseil médical, juridique, financier ou religieux précis.
+- Aucune promesse (remboursement, cadeau, concours, collaboration).
+- Aucune information personnelle sur le compte ou sur la personne qui commente.
+- Aucun sujet politique ni polémique.
+- Ne mentionne jamais que tu es une IA ou un assistant.
+
+EXEMPLES:
+- Commentaire: "MashaAllah super vidéo! Où tu as acheté ça?" -> "Coucou Fatima! Baraka Allahou fik 🤍 Toutes les infos sont en description!"
+- Commentaire: "Merci pour le partage ma sœur" -> "Hello! Avec plaisir ma belle, contente que ça te serve 🥰"
+- Commentaire: "😍😍😍" -> "Coucou Sarah! Merci beaucoup 💕"
+- Commentaire: "C'est trop cher pour ce que c'est" -> "Hello! Merci pour ton retour, chacun son budget 🙏 Je partage d'autres bons plans bientôt!"
+- Commentaire: "Ça fait 3 mois que je cherche un travail, je suis découragée" -> "Coucou Amina! Courage ma belle, ne lâche rien, ton tour va arriver 💪"
+- Commentaire: "Tu peux faire une vidéo sur les produits pour bébé?" -> "Hello! Super idée, je la note pour une prochaine vidéo 🥰"
+- Commentaire: "Amine 🤲" -> "Coucou Yasmine! Amine, qu'Allah te le rende 🤍"
+
+6. Cohérence du batch
+- Traite chaque commentaire indépendamment: ne fais pas référence aux autres commentaires.
+- Si plusieurs commentaires sont identiques, donne quand même une réponse à chacun, avec une formulation différente.
+- Ne fusionne jamais deux commentaires en une seule réponse et n'en saute aucun.
+- Le nombre de réponses doit être exactement égal au nombre de commentaires reçus.
+
+7. Qualité avant envoi
+- Relis chaque réponse: orthographe correcte, pas de majuscules excessives, pas de points d'exclamation multiples.
+- Vérifie que la réponse a du sens même sans voir la vidéo.
+- Vérifie que la réponse respecte toutes les règles ci-dessus et la limite de 114 caractères.
+
+FORMAT D'ENTRÉE:
+Le message utilisateur contient le contexte de la vidéo (titre, hashtags) puis les commentaires à traiter
+sous forme de tableau JSON: [{"i": numéro, "u": "nom_utilisateur", "t": "texte_du_commentaire"}, ...]
+Utilise le titre et les hashtags uniquement pour comprendre le sujet de la vidéo.
+
+RÉPONSE ATTENDUE:
+Retourne UNIQUEMENT un JSON valide avec ce format exact (sans markdown, sans backticks):
+{"responses": ["réponse_au_commentaire_1", "réponse_au_commentaire_2"]}
+
+- Une réponse par commentaire, dans le même ordre que le tableau (la 1ère réponse correspond au commentaire "i": 1, etc.)
+- Ne recopie PAS les noms d'utilisateur ni les commentaires
+
+RAPPEL CRITIQUE: Chaque réponse doit faire MAXIMUM 114 caractères!
+"""
+
+@functools.lru_cache(maxsize=128)
+def _hashtags_str(hashtags: Tuple[str, ...]) -> str:
+    """Formater les hashtags d'une vidéo pour le prompt"""
+    return ', '.join(hashtags) if hashtags else 'Aucun hashtag'
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """Convertir une durée OpenAI ("20ms", "1s", "6m0s") en secondes"""
+    if not value:
+        return None
+    matches = _DURATION_RE.findall(value)
+    if not matches:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in matches)
+
+class _RateLimiter:
+    """
+    Suivi des limites de débit OpenAI à partir des en-têtes x-ratelimit-*
+    Les appels attendent la réinitialisation du quota au lieu de recevoir une 429
+    """
+    
+    def __init__(self):
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.reset_at = 0.0  # time.monotonic() de la prochaine réinitialisation
+    
+    async def acquire(self):
+        """Attendre si le quota connu est épuisé, puis réserver une requête"""
+        while self._exhausted():
+            delay = self.reset_at - time.monotonic()
+            if delay <= 0:
+                # Quota réinitialisé: les prochains en-têtes donneront les vraies valeurs
+                self.remaining_requests = None
+                self.remaining_tokens = None
+                break
+            await asyncio.sleep(delay)
+        
+        if self.remaining_requests is not None:
+            self.remaining_requests -= 1
+    
+    def _exhausted(self) -> bool:
+        return (
+            (self.remaining_requests is not None and self.remaining_requests <= 0)
+            or (self.remaining_tokens is not None and self.remaining_tokens <= 0)
+        )
+    
+    def update(self, headers):
+        """Mettre à jour le quota à partir des en-têtes d'une réponse"""
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        if remaining_requests is not None:
+            self.remaining_requests = int(remaining_requests)
+        if remaining_tokens is not None:
+            self.remaining_tokens = int(remaining_tokens)
+        
+        resets = [
+            _parse_duration(headers.get("x-ratelimit-reset-requests")),
+            _parse_duration(headers.get("x-ratelimit-reset-tokens")),
+        ]
+        resets = [reset for reset in resets if reset is not None]
+        if resets:
+            self.reset_at = time.monotonic() + max(resets)
+    
+    def on_rate_limited(self, error: RateLimitError, attempt: int) -> float:
+        """
+        Bloquer les appels jusqu'à la fin du délai indiqué par une 429
+        
+        Returns:
+            float: Délai à attendre (retry-after + jitter) en secondes
+        """
+        headers = error.response.headers
+        retry_after = headers.get("retry-after")
+        retry_after_ms = headers.get("retry-after-ms")
+        
+        if retry_after_ms is not None:
+            delay = float(retry_after_ms) / 1000
+        elif retry_after is not None:
+            delay = float(retry_after)
+        else:
+            delay = (
+                _parse_duration(headers.get("x-ratelimit-reset-requests"))
+                or _parse_duration(headers.get("x-ratelimit-reset-tokens"))
+                or 2 ** attempt
+            )
+        
+        delay += random.uniform(0, 0.5)
+        self.remaining_requests = 0
+        self.reset_at = max(self.reset_at, time.monotonic() + delay)
+        return delay
+
+class _ResponseStreamParser:
+    """
+    Extraire au fil du flux les chaînes du tableau {"responses": ["...", ...]}
+    Chaque appel à feed() retourne les réponses complétées par le nouveau fragment.
+    
+    Seules les chaînes placées directement dans ce tableau sont retournées: au
+    premier élément d'une autre forme (objet, tableau imbriqué, nombre...), la
+    lecture s'arrête et le texte complet est parsé à la fin par l'appelant.
+    """
+    
+    def __init__(self):
+        self.text = ""
+        self.pos = 0
+        self.containers: List[str] = []  # "{" / "[" ouverts autour de la position courante
+        self.last_key: Optional[str] = None  # Dernière chaîne lue au premier niveau de l'objet
+        self.responses_depth: Optional[int] = None  # Profondeur du tableau "responses"
+        self.string_start: Optional[int] = None
+        self.escaped = False
+        self.done = False
+    
+    def _in_responses(self) -> bool:
+        return len(self.containers) == self.responses_depth
+    
+    def feed(self, chunk: str) -> List[str]:
+        self.text += chunk
+        responses = []
+        
+        while self.pos < len(self.text) and not self.done:
+            char = self.text[self.pos]
+            
+            if self.string_start is not None:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    value = _loads(self.text[self.string_start:self.pos + 1])
+                    self.string_start = None
+                    if self._in_responses():
+                        responses.append(value)
+                    elif self.containers == ["{"]:
+                        self.last_key = value
+            elif char == '"':
+                self.string_start = self.pos
+            elif self._in_responses():
+                # Fin du tableau, ou élément qui n'est pas une chaîne: arrêt
+                self.done = char not in " \t\r\n,"
+            elif char in "{[":
+                if char == "[" and self.containers == ["{"] and self.last_key == "responses":
+                    self.responses_depth = len(self.containers) + 1
+                self.containers.append(char)
+            elif char in "}]" and self.containers:
+                self.containers.pop()
+            
+            self.pos += 1
+        
+        return responses
+
+class _SemanticIndex:
+    """
+    Index NumPy des embeddings (normalisés) de commentaires déjà traités
+    et de leurs réponses, limité aux max_size dernières entrées
+    """
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.embeddings = None
+        self.responses: List[str] = []
+    
+    def __len__(self) -> int:
+        return len(self.responses)
+    
+    def search(self, queries: np.ndarray, threshold: float) -> List[Optional[str]]:
+        """Retourner la réponse la plus proche de chaque requête si similarité >= threshold"""
+        if self.embeddings is None:
+            return [None] * len(queries)
+        
+        similarities = queries @ self.embeddings.T
+        best = similarities.argmax(axis=1)
+        
+        return [
+            self.responses[j] if similarities[i, j] >= threshold else None
+            for i, j in enumerate(best)
+        ]
+    
+    def add(self, embeddings: np.ndarray, responses: List[str]):
+        """Ajouter des entrées (les plus anciennes sont évincées)"""
+        if self.embeddings is None:
+            self.embeddings = embeddings[-self.max_size:]
+        else:
+            self.embeddings = np.vstack([self.embeddings, embeddings])[-self.max_size:]
+        self.responses = (self.responses + responses)[-self.max_size:]
+
 class AIResponseGenerator:
     """
     Classe pour générer des réponses IA aux commentaires TikTok
@@ -24,127 +372,508 @@ class AIResponseGenerator:
                 "Définissez la variable d'environnement: export OPENAI_API_KEY='sk-...'"
             )
         
-        self.client = OpenAI(api_key=api_key)
-        self.model = os.getenv("OPENAI_MODEL", "gpt-4")
-        logger.info(f"Client OpenAI initialisé (modèle: {self.model})")
+        # Pool de connexions persistant (HTTP/2) partagé par tous les appels concurrents
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=1000, max_keepalive_connections=1000),
+            http2=True,
+        )
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            max_retries=2,
+            timeout=60,
+            http_client=self.http_client,
+        )
+        self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_CALLS)
+        self.rate_limiter = _RateLimiter()
+        # Parser simdjson réutilisé entre les appels (buffers internes conservés)
+        self.parser = simdjson.Parser() if simdjson is not None else None
+        # Cache exact (LRU): (titre, hashtags, commentaire) -> réponse modèle
+        self._exact_cache: "OrderedDict[Tuple, str]" = OrderedDict()
+        # Cache sémantique: (titre, hashtags) -> index des commentaires déjà traités
+        self._semantic_indexes: "OrderedDict[Tuple, _SemanticIndex]" = OrderedDict()
+        logger.info("Client OpenAI initialisé (modèle: %s)", self.model)
     
-    def generate_batch_responses(
+    async def generate_batch_responses(
         self, 
         comments_data: List[Dict], 
         video_title: str, 
-        hashtags: List[str]
+        hashtags: List[str],
+        on_response: Optional[Callable[[int, str], None]] = None
     ) -> List[str]:
         """
-        Générer des réponses IA pour tous les commentaires en un seul appel
+        Générer des réponses IA pour tous les commentaires
+        
+        Les commentaires sont découpés en sous-batches de BATCH_SIZE,
+        traités en parallèle (au plus MAX_CONCURRENT_CALLS appels simultanés).
         
         Args:
             comments_data: Liste des commentaires [{username, comment_text}, ...]
             video_title: Titre de la vidéo
             hashtags: Liste des hashtags
+            on_response: Appelé avec (index du commentaire, réponse) dès qu'une
+                réponse est connue, une seule fois par commentaire (optionnel)
             
         Returns:
-            List[str]: Liste des réponses IA correspondantes
+            List[str]: Liste des réponses IA correspondantes (même ordre)
         """
         if not comments_data:
             logger.warning("Aucun commentaire à traiter")
             return []
         
+        logger.info("Génération de %s réponses IA...", len(comments_data))
+        
+        hashtags = tuple(hashtags or ())
+        context = (video_title, hashtags)
+        responses: List[Optional[str]] = [None] * len(comments_data)
+        
+        # 1. Cache exact
+        for i, comment in enumerate(comments_data):
+            template = self._exact_cache_get(context + (comment['comment_text'],))
+            if template is not None:
+                responses[i] = self._personalize(template, comment['username'])
+        
+        misses = [i for i, response in enumerate(responses) if response is None]
+        
+        # 2. Cache sémantique (un seul appel embeddings pour tous les manqués)
+        embeddings = await self._embed([comments_data[i]['comment_text'] for i in misses]) if misses else None
+        if embeddings is not None:
+            index = self._semantic_indexes.get(context)
+            if index is not None:
+                for i, template in zip(misses, index.search(embeddings, SEMANTIC_CACHE_THRESHOLD)):
+                    if template is not None:
+                        responses[i] = self._personalize(template, comments_data[i]['username'])
+        
+        cache_hits = sum(response is not None for response in responses)
+        uncached = [i for i, response in enumerate(responses) if response is None]
+        
+        if on_response is not None:
+            for i, response in enumerate(responses):
+                if response is not None:
+                    on_response(i, response)
+        
+        # 3. Appels API pour les commentaires restants, en sous-batches parallèles
+        shards = [
+            uncached[i:i + BATCH_SIZE]
+            for i in range(0, len(uncached), BATCH_SIZE)
+        ]
+        
+        def shard_callback(shard: List[int]) -> Optional[Callable[[int, str], None]]:
+            """Traduire l'index dans le sous-batch en index dans comments_data"""
+            if on_response is None:
+                return None
+            return lambda j, response: on_response(shard[j], response)
+        
+        results = await asyncio.gather(*[
+            self._call_one(
+                [comments_data[i] for i in shard],
+                video_title,
+                hashtags,
+                on_response=shard_callback(shard)
+            )
+            for shard in shards
+        ])
+        
+        generated = []
+        for shard, shard_responses in zip(shards, results):
+            for i, response in zip(shard, shard_responses):
+                responses[i] = response
+                generated.append(i)
+        
+        self._cache_store(context, comments_data, responses, generated, misses, embeddings)
+        
+        logger.info(
+            " %s réponses générées (%s depuis le cache, %s appel(s) API)",
+            len(responses), cache_hits, len(shards)
+        )
+        return responses
+    
+    # ==================== CACHE DES RÉPONSES ====================
+    
+    def _exact_cache_get(self, key: Tuple) -> Optional[str]:
+        """Lire le cache exact (et marquer l'entrée comme récemment utilisée)"""
+        template = self._exact_cache.get(key)
+        if template is not None:
+            self._exact_cache.move_to_end(key)
+        return template
+    
+    async def _embed(self, texts: List[str]) -> Optional[np.ndarray]:
+        """
+        Calculer les embeddings normalisés des textes
+        
+        Returns:
+            Optional[np.ndarray]: Matrice (len(texts), dim), ou None si l'appel échoue
+        """
         try:
-            logger.info(f"Génération de {len(comments_data)} réponses IA...")
-            
-            # Construire le prompt batch
-            prompt = self._build_batch_prompt(comments_data, video_title, hashtags)
-            
-            # Appeler l'API OpenAI
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "Tu es un assistant qui retourne uniquement du JSON valide."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                max_tokens=4000,
-                temperature=0.7,
+            response = await self.client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+            embeddings = np.array([item.embedding for item in response.data], dtype=np.float32)
+            return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        except Exception as e:
+            logger.warning("Cache sémantique indisponible: %s", e)
+            return None
+    
+    def _cache_store(
+        self, 
+        context: Tuple, 
+        comments_data: List[Dict], 
+        responses: List[str], 
+        generated: List[int], 
+        misses: List[int], 
+        embeddings: Optional[np.ndarray]
+    ):
+        """Mettre en cache les réponses générées par l'API (hors réponses par défaut)"""
+        templates = {
+            i: self._templatize(responses[i], comments_data[i]['username'])
+            for i in generated
+            if responses[i] != DEFAULT_RESPONSE
+        }
+        stored = [i for i, template in templates.items() if template is not None]
+        
+        for i in stored:
+            self._exact_cache[context + (comments_data[i]['comment_text'],)] = templates[i]
+        while len(self._exact_cache) > RESPONSE_CACHE_SIZE:
+            self._exact_cache.popitem(last=False)
+        
+        if embeddings is None or not stored:
+            return
+        
+        rows = {i: row for row, i in enumerate(misses)}
+        index = self._semantic_indexes.get(context)
+        if index is None:
+            index = self._semantic_indexes[context] = _SemanticIndex(
+                min(RESPONSE_CACHE_SIZE, SEMANTIC_CACHE_MAX_ENTRIES)
             )
+            while len(self._semantic_indexes) > SEMANTIC_CACHE_CONTEXTS:
+                self._semantic_indexes.popitem(last=False)
+        self._semantic_indexes.move_to_end(context)
+        
+        index.add(embeddings[[rows[i] for i in stored]], [templates[i] for i in stored])
+        
+        # Plafond global: évincer les vidéos les moins récemment utilisées
+        total = sum(len(index) for index in self._semantic_indexes.values())
+        while total > SEMANTIC_CACHE_MAX_ENTRIES and len(self._semantic_indexes) > 1:
+            _, evicted = self._semantic_indexes.popitem(last=False)
+            total -= len(evicted)
+    
+    @staticmethod
+    def _greeting_name(username: str) -> Optional[str]:
+        """
+        Prénom utilisé dans la salutation (mêmes règles que le prompt):
+        sans "@" ni chiffres/underscores de fin, None si trop long ou illisible
+        """
+        name = username.lstrip('@').strip()
+        match = _NAME_RE.match(name)
+        if len(name) > 15 or match is None or len(match.group()) < _MIN_NAME_LENGTH:
+            return None
+        return match.group()[0].upper() + match.group()[1:]
+    
+    def _templatize(self, response: str, username: str) -> Optional[str]:
+        """
+        Retirer la salutation d'une réponse pour la réutiliser
+        
+        Returns:
+            Optional[str]: Réponse sans salutation (préfixée par le marqueur),
+            ou None si la réponse cite encore la personne et n'est pas réutilisable
+        """
+        match = _GREETING_RE.match(response)
+        if match is None and _GREETING_WORD_RE.match(response):
+            return None  # Salutation non reconnue: nom impossible à isoler
+        
+        body = response[match.end():] if match else response
+        names = {username.lstrip('@').strip(), self._greeting_name(username) or ""}
+        if match:
+            names.update(match.group('name').split())
+        
+        for name in names:
+            if len(name) >= _MIN_NAME_LENGTH and re.search(
+                rf"(?<!\w){re.escape(name)}(?!\w)", body, re.IGNORECASE
+            ):
+                return None
+        
+        return _USERNAME_PLACEHOLDER + body if match else body
+    
+    def _personalize(self, template: str, username: str) -> str:
+        """Reconstruire la salutation d'une réponse du cache pour cet utilisateur"""
+        if not template.startswith(_USERNAME_PLACEHOLDER):
+            return template
+        
+        name = self._greeting_name(username)
+        greeting = f"Coucou {name}!" if name else "Hello!"
+        body = template[len(_USERNAME_PLACEHOLDER):]
+        return self.truncate_response(f"{greeting} {body}" if body else greeting)
+    
+    async def _call_one(
+        self, 
+        comments_data: List[Dict], 
+        video_title: str, 
+        hashtags: Tuple[str, ...],
+        on_response: Optional[Callable[[int, str], None]] = None
+    ) -> List[str]:
+        """
+        Générer les réponses d'un sous-batch en un seul appel API
+        
+        La complétion est reçue en streaming: chaque réponse est transmise à
+        on_response dès que sa chaîne JSON est complète. Si le flux ne peut
+        pas être lu au fil de l'eau, le texte complet est parsé à la fin.
+        
+        Returns:
+            List[str]: Exactement une réponse par commentaire du sous-batch
+        """
+        responses: List[str] = []
+        
+        def emit(response: str):
+            if on_response is not None:
+                on_response(len(responses), response)
+            responses.append(response)
+        
+        try:
+            # Construire la requête batch
+            request_body = self._build_request_body(comments_data, video_title, hashtags)
             
-            # Parser la réponse JSON
-            response_text = response.choices[0].message.content.strip()
-            logger.info(f"Réponse API reçue ({len(response_text)} caractères)")
+            # Appeler l'API OpenAI en streaming
+            chunks = []
+            stream_parser = _ResponseStreamParser()
             
-            # Nettoyer et parser le JSON
-            parsed_responses = self._parse_json_response(response_text)
+            async with self.semaphore:
+                stream = await self._create_completion({**request_body, "stream": True})
+                
+                async for chunk in stream:
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    
+                    delta = chunk.choices[0].delta.content
+                    chunks.append(delta)
+                    
+                    for response in stream_parser.feed(delta):
+                        if len(responses) < len(comments_data):
+                            emit(self.truncate_response(response))
             
-            if len(parsed_responses) != len(comments_data):
-                logger.warning(
-                    f"Nombre de réponses ({len(parsed_responses)}) "
-                    f"différent du nombre de commentaires ({len(comments_data)})"
-                )
+            response_text = "".join(chunks).strip()
+            logger.debug("Réponse API reçue (%s caractères)", len(response_text))
+            
+            if len(responses) < len(comments_data):
+                # Fallback: parser le texte complet et compléter les réponses manquantes
+                parsed_responses = self._parse_json_response(response_text)
+                parsed_responses = self._align_responses(parsed_responses, len(comments_data))
+                
+                # Vérifier la longueur de tout le sous-batch en une passe
+                for response in self.truncate_batch(parsed_responses)[len(responses):]:
+                    emit(response)
             
-            logger.info(f" {len(parsed_responses)} réponses générées avec succès")
-            return parsed_responses
+            return responses
             
         except Exception as e:
-            logger.error(f" Erreur génération réponses IA: {e}")
-            # Retourner des réponses par défaut en cas d'erreur
-            return [
-                "Merci pour ton commentaire" 
-                for _ in comments_data
+            logger.error(" Erreur génération réponses IA: %s", e)
+            # Réponses par défaut pour les commentaires restants
+            while len(responses) < len(comments_data):
+                emit(DEFAULT_RESPONSE)
+            return responses
+    
+    async def _create_completion(self, request_body: Dict):
+        """
+        Appeler chat.completions en respectant les limites de débit
+        (attente exacte du retry-after en cas de 429, jusqu'à RATE_LIMIT_MAX_RETRIES fois;
+        backoff exponentiel pour les erreurs réseau, 408/409 et 5xx comme le SDK)
+        """
+        # Les 429 sont gérées ici plutôt que par le backoff exponentiel du SDK
+        client = self.client.with_options(max_retries=0)
+        rate_limit_attempts = 0
+        transient_attempts = 0
+        
+        while True:
+            await self.rate_limiter.acquire()
+            try:
+                raw_response = await client.chat.completions.with_raw_response.create(**request_body)
+            except RateLimitError as e:
+                if rate_limit_attempts == RATE_LIMIT_MAX_RETRIES:
+                    raise
+                delay = self.rate_limiter.on_rate_limited(e, rate_limit_attempts)
+                rate_limit_attempts += 1
+                logger.warning("Limite de débit OpenAI atteinte, nouvelle tentative dans %.1fs", delay)
+                await asyncio.sleep(delay)
+                continue
+            except (APIConnectionError, APIStatusError) as e:
+                # APITimeoutError hérite d'APIConnectionError
+                transient = isinstance(e, (APIConnectionError, InternalServerError)) or e.status_code in (408, 409)
+                if not transient or transient_attempts == self.client.max_retries:
+                    raise
+                delay = min(0.5 * 2 ** transient_attempts, 8) + random.uniform(0, 0.25)
+                transient_attempts += 1
+                logger.warning("Erreur OpenAI transitoire (%s), nouvelle tentative dans %.1fs", e, delay)
+                await asyncio.sleep(delay)
+                continue
+            
+            self.rate_limiter.update(raw_response.headers)
+            return raw_response.parse()
+    
+    def _build_request_body(
+        self, 
+        comments_data: List[Dict], 
+        video_title: str, 
+        hashtags: Tuple[str, ...]
+    ) -> Dict:
+        """Construire les paramètres de chat.completions pour un sous-batch"""
+        user_text = self._build_batch_prompt(comments_data, video_title, hashtags)
+        
+        return {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system", 
+                    "content": SYSTEM_PROMPT_BATCH
+                },
+                {
+                    "role": "user", 
+                    "content": user_text
+                }
+            ],
+            # ~120 tokens par réponse de 114 caractères maximum
+            "max_tokens": MAX_TOKENS_PER_RESPONSE * len(comments_data),
+            "temperature": 0.5,
+        }
+    
+    def _align_responses(self, responses: List[str], expected_count: int) -> List[str]:
+        """Compléter ou tronquer la liste pour avoir une réponse par commentaire"""
+        if len(responses) != expected_count:
+            logger.warning(
+                "Nombre de réponses (%s) différent du nombre de commentaires (%s)",
+                len(responses), expected_count
+            )
+            responses = responses[:expected_count]
+            responses += [
+                DEFAULT_RESPONSE
+                for _ in range(expected_count - len(responses))
             ]
+        
+        return responses
     
-    def _build_batch_prompt(
+    # ==================== API BATCH (TRAITEMENT DIFFÉRÉ) ====================
+    
+    async def submit_batch(
         self, 
         comments_data: List[Dict], 
         video_title: str, 
         hashtags: List[str]
     ) -> str:
-        """Construire le prompt pour le batch de commentaires"""
+        """
+        Soumettre les commentaires à l'API Batch OpenAI
+        (traitement différé sous 24h, ~50% moins cher, hors limites de débit temps réel)
         
-        hashtags_str = ', '.join(hashtags) if hashtags else 'Aucun hashtag'
+        Args:
+            comments_data: Liste des commentaires [{username, comment_text}, ...]
+            video_title: Titre de la vidéo
+            hashtags: Liste des hashtags
+            
+        Returns:
+            str: ID du batch OpenAI (à passer à poll_batch)
+        """
+        hashtags = tuple(hashtags or ())
         
-        prompt = f"""Tu es Copywriter GPT, un copywriter chaleureux et empathique pour TikTok. Tu réponds aux commentaires sur les vidéos tiktok.
-
-CONTEXTE DE LA VIDÉO:
-- Titre: '{video_title}'
-- Hashtags: {hashtags_str}
-- Audience cible: Communauté
-- Objectif: Créer de l'engagement authentique et chaleureux
-
-INSTRUCTIONS IMPORTANTES:
-- Réponds à chaque commentaire avec MAXIMUM 114 caractères
-- Commence par "Coucou [nom]" ou simplement "Hello" si le nom est long
-- Ton chaleureux, amical, comme une grande sœur bienveillante
-- Ne donne JAMAIS de conseils médicaux, juridiques ou religieux précis
-- Évite les questions ouvertes qui créent des débats
-- Reste positive, encourageante et authentique
-- Utilise des emojis appropriés mais avec modération
-
-COMMENTAIRES À TRAITER:
-"""
+        # Une ligne JSONL par sous-batch; custom_id = "<offset>-<taille>"
+        lines = []
+        for offset in range(0, len(comments_data), BATCH_SIZE):
+            shard = comments_data[offset:offset + BATCH_SIZE]
+            lines.append(_dumps({
+                "custom_id": f"{offset}-{len(shard)}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._build_request_body(shard, video_title, hashtags),
+            }))
         
-        # Ajouter chaque commentaire
-        for i, comment in enumerate(comments_data, 1):
-            prompt += f"\n{i}. Utilisateur: {comment['username']} | Commentaire: \"{comment['comment_text']}\""
+        batch_file = await self.client.files.create(
+            file=("batch.jsonl", b"\n".join(lines)),
+            purpose="batch",
+        )
+        batch = await self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+            metadata={"comment_count": str(len(comments_data))},
+        )
         
-        prompt += """
-
-RÉPONSE ATTENDUE:
-Retourne UNIQUEMENT un JSON valide avec ce format exact (sans markdown, sans backticks):
-{
-    "responses": [
-        {"comment_id": 1, "username": "nom_utilisateur", "comment_text": "texte_commentaire", "chatgpt_response": "ta_réponse_114_chars_max"},
-        {"comment_id": 2, "username": "nom_utilisateur", "comment_text": "texte_commentaire", "chatgpt_response": "ta_réponse_114_chars_max"}
-    ]
-}
-
-RAPPEL CRITIQUE: Chaque réponse doit faire MAXIMUM 114 caractères!
-"""
+        logger.info("Batch OpenAI soumis: %s (%s commentaires, %s requêtes)", batch.id, len(comments_data), len(lines))
+        return batch.id
+    
+    async def poll_batch(self, batch_id: str) -> Optional[List[str]]:
+        """
+        Récupérer les réponses d'un batch soumis avec submit_batch
+        
+        Args:
+            batch_id: ID du batch OpenAI
+            
+        Returns:
+            Optional[List[str]]: Réponses dans l'ordre des commentaires soumis
+            (DEFAULT_RESPONSE pour les requêtes sans résultat, p. ex. batch expiré
+            ou annulé), ou None si le batch n'est pas encore terminé
+        """
+        batch = await self.client.batches.retrieve(batch_id)
+        
+        if batch.status in ("validating", "in_progress", "finalizing", "cancelling"):
+            return None
+        
+        # expired/cancelled: les requêtes traitées avant l'arrêt restent dans le fichier de sortie
+        if batch.status != "completed":
+            logger.warning("Batch %s terminé avec le statut '%s': réponses partielles", batch_id, batch.status)
+        
+        comment_count = int(batch.metadata["comment_count"])
+        responses = [DEFAULT_RESPONSE for _ in range(comment_count)]
+        
+        if not batch.output_file_id:
+            logger.error("Batch %s: aucun fichier de sortie", batch_id)
+            return responses
+        
+        output = await self.client.files.content(batch.output_file_id)
+        
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                result = _loads(line)
+                offset, count = (int(part) for part in result["custom_id"].split("-"))
+                body = result["response"]["body"]
+                response_text = body["choices"][0]["message"]["content"].strip()
+                parsed_responses = self._parse_json_response(response_text)
+                responses[offset:offset + count] = self.truncate_batch(
+                    self._align_responses(parsed_responses, count)
+                )
+            except Exception as e:
+                logger.error("Batch %s: ligne de sortie ignorée (%s)", batch_id, e)
+        
+        logger.info("Batch %s récupéré (%s réponses)", batch_id, comment_count)
+        return responses
+    
+    def _build_batch_prompt(
+        self, 
+        comments_data: List[Dict], 
+        video_title: str, 
+        hashtags: Tuple[str, ...]
+    ) -> str:
+        """
+        Construire le message utilisateur pour le batch de commentaires
+        
+        Les instructions statiques sont dans SYSTEM_PROMPT_BATCH (message
+        système) pour profiter du cache de prompt OpenAI. Seuls le contexte
+        de la vidéo et les commentaires sont placés dans le message utilisateur.
+        
+        Returns:
+            str: Message utilisateur
+        """
+        # Commentaires sérialisés en une seule fois (clés courtes: i=numéro, u=utilisateur, t=texte)
+        comments_json = _dumps([
+            {"i": i, "u": comment['username'], "t": comment['comment_text']}
+            for i, comment in enumerate(comments_data, 1)
+        ]).decode()
+        
+        user_text = "".join([
+            "CONTEXTE DE LA VIDÉO:\n",
+            f"- Titre: '{video_title}'\n",
+            f"- Hashtags: {_hashtags_str(hashtags)}\n",
+            "\n",
+            "COMMENTAIRES À TRAITER:\n",
+            comments_json,
+        ])
         
-        return prompt
+        return user_text
     
     def _parse_json_response(self, response_text: str) -> List[str]:
         """
@@ -158,33 +887,37 @@ RAPPEL CRITIQUE: Chaque réponse doit faire MAXIMUM 114 caractères!
         """
         try:
             # Nettoyer le texte (enlever les markdown backticks si présents)
-            cleaned_text = response_text.strip()
-            
-            if "```json" in cleaned_text:
-                cleaned_text = cleaned_text.split("```json")[1].split("```")[0]
-            elif "```" in cleaned_text:
-                cleaned_text = cleaned_text.split("```")[1].split("```")[0]
-            
-            cleaned_text = cleaned_text.strip()
+            match = _FENCE_RE.search(response_text)
+            cleaned_text = match.group(1) if match else response_text.strip()
             
             # Parser le JSON
-            parsed_data = json.loads(cleaned_text)
+            if self.parser is not None:
+                doc = self.parser.parse(cleaned_text.encode())
+                value = doc.get("responses") if isinstance(doc, simdjson.Object) else None
+                # as_list() matérialise le tableau en une fois (évite l'itération via proxy)
+                responses = value.as_list() if isinstance(value, simdjson.Array) else None
+                # Aucun proxy ne doit survivre (ni dans une traceback): le parser refuserait
+                # d'être réutilisé tant que des Object/Array existent
+                del doc, value
+            else:
+                parsed_data = _loads(cleaned_text.encode())
+                responses = parsed_data.get("responses") if isinstance(parsed_data, dict) else None
             
-            # Extraire les réponses
-            responses = parsed_data.get("responses", [])
+            if not isinstance(responses, list):
+                raise ValueError('format inattendu: objet {"responses": [...]} attendu')
             
-            # Retourner uniquement les textes de réponse
+            # Les réponses sont alignées par position sur les commentaires
             return [
-                item.get("chatgpt_response", "Hello! Merci ") 
-                for item in responses
+                response if isinstance(response, str) else DEFAULT_RESPONSE
+                for response in responses
             ]
             
-        except json.JSONDecodeError as e:
-            logger.error(f"Erreur parsing JSON: {e}")
-            logger.error(f"Texte reçu: {response_text[:500]}...")
+        except (JSONDecodeError, ValueError) as e:
+            logger.error("Erreur parsing JSON: %s", e)
+            logger.error("Texte reçu: %s...", response_text[:500])
             raise
     
-    def generate_single_response(
+    async def generate_single_response(
         self, 
         username: str, 
         comment_text: str, 
@@ -205,7 +938,7 @@ RAPPEL CRITIQUE: Chaque réponse doit faire MAXIMUM 114 caractères!
             str: Réponse générée
         """
         try:
-            hashtags_str = ', '.join(hashtags) if hashtags else 'Aucun hashtag'
+            hashtags_str = _hashtags_str(tuple(hashtags or ()))
             
             prompt = f"""Tu es Copywriter GPT pour tiktok".
 
@@ -226,7 +959,7 @@ INSTRUCTIONS:
 
 Retourne UNIQUEMENT la réponse (pas de JSON, juste le texte de la réponse)."""
 
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "Tu es un copywriter TikTok chaleureux et empathique."},
@@ -240,15 +973,20 @@ Retourne UNIQUEMENT la réponse (pas de JSON, juste le texte de la réponse)."""
             
             # Vérifier la longueur
             if len(ai_response) > 114:
-                logger.warning(f"Réponse trop longue ({len(ai_response)} chars), troncature...")
+                logger.warning("Réponse trop longue (%s chars), troncature...", len(ai_response))
                 ai_response = ai_response[:111] + "..."
             
             return ai_response
             
         except Exception as e:
-            logger.error(f" Erreur génération réponse unique: {e}")
+            logger.error(" Erreur génération réponse unique: %s", e)
             return f"Hello {username}! Merci pour ton message "
     
+    async def close(self):
+        """Fermer le pool de connexions HTTP"""
+        await self.client.close()
+        logger.info("Client OpenAI fermé")
+    
     def validate_response_length(self, response: str, max_length: int = 114) -> bool:
         """
         Valider que la réponse respecte la limite de caractères
@@ -277,6 +1015,41 @@ Retourne UNIQUEMENT la réponse (pas de JSON, juste le texte de la réponse)."""
             return response
         
         return response[:max_length - 3] + "..."
+    
+    def validate_batch_lengths(self, responses: List[str], max_length: int = 114) -> List[bool]:
+        """
+        Valider la longueur de toutes les réponses d'un batch
+        
+        Args:
+            responses: Liste des réponses
+            max_length: Longueur maximale autorisée
+            
+        Returns:
+            List[bool]: True pour chaque réponse valide
+        """
+        return [len(response) <= max_length for response in responses]
+    
+    def truncate_batch(self, responses: List[str], max_length: int = 114) -> List[str]:
+        """
+        Tronquer les réponses d'un batch qui dépassent la limite
+        
+        Args:
+            responses: Liste des réponses
+            max_length: Longueur maximale
+            
+        Returns:
+            List[str]: Réponses (tronquées si besoin), dans le même ordre
+        """
+        valid = self.validate_batch_lengths(responses, max_length)
+        
+        if all(valid):
+            return responses
+        
+        logger.warning("%s réponse(s) trop longue(s), troncature...", valid.count(False))
+        return [
+            response if is_valid else response[:max_length - 3] + "..."
+            for response, is_valid in zip(responses, valid)
+        ]
 
 # Test unitaire
 if __name__ == "__main__":
@@ -301,11 +1074,11 @@ if __name__ == "__main__":
         video_title = "Mes bons plans du mois"
         hashtags = ['#bonplan', '#muslim', '#lifestyle']
         
-        responses = ai_handler.generate_batch_responses(
+        responses = asyncio.run(ai_handler.generate_batch_responses(
             test_comments, 
             video_title, 
             hashtags
-        )
+        ))
         
         print("\nRéponses générées:")
         for comment, response in zip(test_comments, responses):
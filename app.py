@@ -1,19 +1,73 @@
 # app.py - Backend FastAPI principal
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
 import uvicorn
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 # Imports locaux
-# from scraper import TikTokScraper
-from ai_handler import AIResponseGenerator
+try:
+    from scraper import ScraperPool
+except ImportError:  # Selenium non installé: scraping et publication indisponibles
+    ScraperPool = None
+from ai_handler import AIResponseGenerator, BATCH_SIZE, DEFAULT_RESPONSE
 from database import Database
 
+# ==================== STARTUP/SHUTDOWN ====================
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialisation au démarrage et nettoyage à l'arrêt"""
+    # Générateur IA unique (pool HTTP partagé), accessible via app.state.ai
+    app.state.ai = AIResponseGenerator()
+    await run_in_threadpool(db.init_database)
+    
+    # Reprendre le suivi des batches OpenAI soumis avant le dernier arrêt
+    await run_in_threadpool(db.reset_orphaned_generating)
+    for batch in await run_in_threadpool(db.get_pending_batches):
+        start_batch_polling(app.state.ai, batch['batch_id'], batch['comment_ids'])
+    
+    # Pool de scrapers pré-démarrés (Chrome coûteux à lancer), via app.state.scrapers
+    scrapers = None
+    if ScraperPool is not None:
+        scrapers = await ScraperPool.create(SCRAPER_POOL_SIZE, headless=SELENIUM_HEADLESS)
+    
+    if scrapers:
+        app.state.scrapers = scrapers
+    else:
+        app.state.scrapers = None
+        print("Scraper indisponible: scraping et publication désactivés")
+    
+    # Checkpoint WAL + statistiques du planificateur à intervalle régulier
+    maintenance_task = asyncio.create_task(run_db_maintenance())
+    
+    print("API TikTok Comment Manager démarrée")
+    
+    yield
+    
+    maintenance_task.cancel()
+    # Batches enregistrés en base: leur suivi reprendra au prochain démarrage
+    for task in list(pending_batches):
+        task.cancel()
+    if scrapers is not None:
+        await scrapers.close()
+    await app.state.ai.close()
+    await run_in_threadpool(db.close)
+    print("API arrêtée proprement")
+
 # ==================== CONFIGURATION ====================
-app = FastAPI(title="TikTok Comment Manager API", version="1.0.0")
+app = FastAPI(
+    title="TikTok Comment Manager API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # Sérialisation orjson des réponses JSON
+)
 
 # CORS pour permettre les requêtes du frontend
 app.add_middleware(
@@ -25,16 +79,30 @@ app.add_middleware(
 )
 
 # Initialisation des services
-db = Database()
-ai_generator = AIResponseGenerator()
-scraper = None  # Initialisé à la demande (Selenium coûteux)
+db = Database()  # API synchrone: appelée via run_in_threadpool depuis les routes async
+
+# Nombre de navigateurs Selenium lancés au démarrage (scrapings/publications simultanés)
+SCRAPER_POOL_SIZE = int(os.getenv("SCRAPER_POOL_SIZE", "2"))
+SELENIUM_HEADLESS = os.getenv("SELENIUM_HEADLESS", "false").lower() == "true"
+
+# Batches OpenAI en attente de résultats (références gardées pour éviter le GC)
+pending_batches = set()
+BATCH_POLL_INTERVAL = int(os.getenv("OPENAI_BATCH_POLL_INTERVAL", "60"))  # secondes
+BATCH_POLL_MAX_ERRORS = 30  # Erreurs consécutives avant abandon du suivi (repris au redémarrage)
+
+# Intervalle entre deux maintenances de la base (checkpoint WAL, PRAGMA optimize)
+DB_MAINTENANCE_INTERVAL = int(os.getenv("DB_MAINTENANCE_INTERVAL", "1800"))  # secondes
 
 # ==================== MODELS PYDANTIC ====================
-class VideoURL(BaseModel):
+class APIModel(BaseModel):
+    """Modèle de base: espaces superflus retirés des champs texte"""
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+class VideoURL(APIModel):
     url: str
     account_id: int
 
-class CommentResponse(BaseModel):
+class CommentResponse(APIModel):
     comment_id: int
     username: str
     comment_text: str
@@ -42,23 +110,33 @@ class CommentResponse(BaseModel):
     status: str = "pending"
     video_url: str
 
-class ValidateComment(BaseModel):
+class ValidateComment(APIModel):
     comment_id: int
     action: str  # "validate", "reject", "modify"
     modified_response: Optional[str] = None
 
-class PublishRequest(BaseModel):
+class PublishRequest(APIModel):
     comment_ids: List[int]
     account_id: int
 
-class TikTokAccount(BaseModel):
+class TikTokAccount(APIModel):
     username: str
     active: bool = False
 
-class UpdateComment(BaseModel):
+class UpdateComment(APIModel):
     comment_id: int
     ai_response: str
 
+# ==================== DÉPENDANCES ====================
+
+def get_ai_generator(request: Request) -> AIResponseGenerator:
+    """Générateur IA partagé, créé une seule fois dans lifespan"""
+    return request.app.state.ai
+
+def get_scraper_pool(request: Request) -> Optional[ScraperPool]:
+    """Pool de scrapers créé dans lifespan (None si Selenium indisponible)"""
+    return request.app.state.scrapers
+
 # ==================== ROUTES API ====================
 
 @app.get("/")
@@ -71,21 +149,39 @@ async def root():
     }
 
 @app.post("/api/scrape")
-async def scrape_video(video_data: VideoURL, background_tasks: BackgroundTasks):
+async def scrape_video(
+    video_data: VideoURL,
+    background_tasks: BackgroundTasks,
+    mode: str = "live",
+    ai_generator: AIResponseGenerator = Depends(get_ai_generator),
+    scraper_pool: Optional[ScraperPool] = Depends(get_scraper_pool)
+):
     """
     Scraper une vidéo TikTok et générer les réponses IA
+    
+    mode="live": réponses générées immédiatement (API temps réel)
+    mode="batch": réponses générées via l'API Batch OpenAI (différé, moins cher)
     """
+    if mode not in ("live", "batch"):
+        raise HTTPException(status_code=400, detail="Mode invalide (live ou batch)")
+    
+    if scraper_pool is None:
+        raise HTTPException(status_code=503, detail="Scraper indisponible")
+    
     try:
         # Vérifier que le compte existe et est actif
-        account = db.get_account(video_data.account_id)
+        account = await run_in_threadpool(db.get_account, video_data.account_id)
         if not account or not account['active']:
             raise HTTPException(status_code=400, detail="Compte non actif ou inexistant")
         
         # Lancer le scraping en arrière-plan
         background_tasks.add_task(
             process_video_scraping,
+            ai_generator,
+            scraper_pool,
             video_data.url,
-            video_data.account_id
+            video_data.account_id,
+            mode
         )
         
         return {
@@ -97,55 +193,208 @@ async def scrape_video(video_data: VideoURL, background_tasks: BackgroundTasks):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur de scraping: {str(e)}")
 
-async def process_video_scraping(video_url: str, account_id: int):
+async def process_video_scraping(
+    ai_generator: AIResponseGenerator,
+    scraper_pool: ScraperPool,
+    video_url: str,
+    account_id: int,
+    mode: str = "live"
+):
     """
     Fonction de traitement en arrière-plan du scraping
     """
-    global scraper
-    
-    try:
-        # Initialiser Selenium
-        if not scraper:
-            scraper = TikTokScraper()
+    # Attendre un scraper libre dans le pool (rendu à la sortie du bloc)
+    async with scraper_pool.acquire() as scraper:
+        try:
+            if mode == "batch":
+                # Scraper tous les commentaires
+                comments_data = await run_in_threadpool(scraper.scrape_video, video_url)
+            
+                if not comments_data:
+                    print(f"Aucun commentaire trouvé pour {video_url}")
+                    return
+            
+                # Extraire infos vidéo
+                video_info = scraper.get_video_info()
+            
+                # Commentaires sauvegardés avant la soumission: rien n'est perdu si le batch échoue
+                comment_ids = await run_in_threadpool(
+                    save_scraped_comments,
+                    video_url,
+                    account_id,
+                    comments_data,
+                    [DEFAULT_RESPONSE] * len(comments_data),
+                    'generating'
+                )
+            
+                # Soumettre à l'API Batch, les réponses seront sauvegardées à la fin du batch
+                try:
+                    batch_id = await ai_generator.submit_batch(
+                        comments_data,
+                        video_info['title'],
+                        video_info['hashtags']
+                    )
+                except Exception:
+                    # Réponses par défaut, à modifier lors de la validation
+                    await run_in_threadpool(
+                        db.update_comments_status_bulk,
+                        [(comment_id, 'pending') for comment_id in comment_ids]
+                    )
+                    raise
+                
+                print(f"Batch {batch_id} soumis: {len(comments_data)} commentaires")
+                await run_in_threadpool(db.save_batch, batch_id, comment_ids)
+                start_batch_polling(ai_generator, batch_id, comment_ids)
+                return
         
-        # Scraper les commentaires
-        comments_data = scraper.scrape_video(video_url)
+            # Chaque réponse reçue (streaming) est mise en file; le writer sauvegarde
+            # en une transaction tout ce qui est disponible, pendant que l'IA continue
+            rows = asyncio.Queue()
+            writer = asyncio.create_task(save_queued_comments(rows))
         
-        if not comments_data:
-            print(f"Aucun commentaire trouvé pour {video_url}")
-            return
+            def queue_responses(batch: List[dict]):
+                return lambda i, ai_response: rows.put_nowait(
+                    comment_row(video_url, account_id, batch[i], ai_response)
+                )
         
-        # Extraire infos vidéo
-        video_info = scraper.get_video_info()
+            # Chaque lot scrapé part à l'IA pendant que le scroll continue
+            tasks = []
+            try:
+                async for batch in scraper.scrape_video_streaming(video_url, batch_size=BATCH_SIZE):
+                    video_info = scraper.get_video_info()
+                    tasks.append(asyncio.create_task(ai_generator.generate_batch_responses(
+                        batch,
+                        video_info['title'],
+                        video_info['hashtags'],
+                        on_response=queue_responses(batch)
+                    )))
+            finally:
+                # Sauvegarder les réponses des lots déjà scrapés, même si le scroll a échoué
+                await asyncio.gather(*tasks, return_exceptions=True)
+                rows.put_nowait(None)
+                comment_count = await writer
         
-        # Générer les réponses IA en batch
-        ai_responses = ai_generator.generate_batch_responses(
-            comments_data,
-            video_info['title'],
-            video_info['hashtags']
-        )
+            if not tasks:
+                print(f"Aucun commentaire trouvé pour {video_url}")
+                return
         
-        # Sauvegarder dans la base de données
-        for comment, ai_response in zip(comments_data, ai_responses):
-            db.save_comment({
-                'video_url': video_url,
-                'account_id': account_id,
-                'username': comment['username'],
-                'comment_text': comment['comment_text'],
-                'ai_response': ai_response,
-                'status': 'pending',
-                'created_at': datetime.now()
-            })
+            print(f"Scraping terminé: {comment_count} commentaires traités")
         
-        print(f"Scraping terminé: {len(comments_data)} commentaires traités")
+        except Exception as e:
+            print(f"Erreur lors du scraping: {e}")
+
+def start_batch_polling(ai_generator: AIResponseGenerator, batch_id: str, comment_ids: List[int]):
+    """Suivre un batch OpenAI en tâche de fond jusqu'à la sauvegarde de ses réponses"""
+    task = asyncio.create_task(process_batch_results(ai_generator, batch_id, comment_ids))
+    pending_batches.add(task)
+    task.add_done_callback(pending_batches.discard)
+
+async def process_batch_results(
+    ai_generator: AIResponseGenerator,
+    batch_id: str,
+    comment_ids: List[int]
+):
+    """
+    Attendre la fin d'un batch OpenAI puis sauvegarder les réponses
+    
+    Les commentaires sont déjà en base (statut 'generating'): seules leurs
+    réponses sont mises à jour. Le batch reste enregistré tant que ses
+    réponses ne sont pas sauvegardées, et son suivi reprend au redémarrage.
+    """
+    errors = 0
+    while True:
+        try:
+            ai_responses = await ai_generator.poll_batch(batch_id)
+            errors = 0
+        except Exception as e:
+            # Erreur réseau ou API passagère: réessayer au prochain intervalle
+            errors += 1
+            if errors >= BATCH_POLL_MAX_ERRORS:
+                print(f"Suivi du batch {batch_id} abandonné après {errors} erreurs: {e}")
+                return
+            print(f"Erreur lors du suivi du batch {batch_id} (nouvelle tentative): {e}")
+            ai_responses = None
         
+        if ai_responses is not None:
+            break
+        await asyncio.sleep(BATCH_POLL_INTERVAL)
+    
+    try:
+        updated = await run_in_threadpool(
+            db.complete_batch, batch_id, list(zip(comment_ids, ai_responses))
+        )
+        print(f"Batch {batch_id} terminé: {updated}/{len(comment_ids)} commentaires traités")
     except Exception as e:
-        print(f"Erreur lors du scraping: {e}")
-    finally:
-        # Fermer Selenium si besoin
-        if scraper:
-            scraper.close()
-            scraper = None
+        print(f"Erreur lors de la sauvegarde du batch {batch_id}: {e}")
+
+async def run_db_maintenance():
+    """Tâche de fond: maintenance périodique de la base pendant toute la vie de l'API"""
+    while True:
+        await asyncio.sleep(DB_MAINTENANCE_INTERVAL)
+        try:
+            await run_in_threadpool(db.maintenance)
+        except Exception as e:
+            print(f"Erreur maintenance base de données: {e}")
+
+def comment_row(
+    video_url: str,
+    account_id: int,
+    comment: dict,
+    ai_response: str,
+    status: str = 'pending'
+) -> dict:
+    """Construire la ligne à sauvegarder pour un commentaire scrapé"""
+    return {
+        'video_url': video_url,
+        'account_id': account_id,
+        'username': comment['username'],
+        'comment_text': comment['comment_text'],
+        'ai_response': ai_response,
+        'status': status,
+        'created_at': datetime.now()
+    }
+
+def save_scraped_comments(
+    video_url: str,
+    account_id: int,
+    comments_data: List[dict],
+    ai_responses: List[str],
+    status: str = 'pending'
+) -> List[int]:
+    """Sauvegarder les commentaires scrapés et leurs réponses IA (une seule transaction)"""
+    return db.save_comments_bulk([
+        comment_row(video_url, account_id, comment, ai_response, status)
+        for comment, ai_response in zip(comments_data, ai_responses)
+    ])
+
+async def save_queued_comments(rows: asyncio.Queue) -> int:
+    """
+    Sauvegarder les commentaires mis en file jusqu'à recevoir None
+    
+    Returns:
+        int: Nombre de commentaires sauvegardés
+    """
+    saved = 0
+    done = False
+    
+    while not done:
+        # Attendre une ligne puis prendre toutes celles déjà disponibles
+        pending = [await rows.get()]
+        while not rows.empty():
+            pending.append(rows.get_nowait())
+        
+        if pending[-1] is None:
+            done = True
+            pending.pop()
+        
+        if pending:
+            try:
+                await run_in_threadpool(db.save_comments_bulk, pending)
+                saved += len(pending)
+            except Exception as e:
+                print(f"Erreur sauvegarde de {len(pending)} commentaires: {e}")
+    
+    return saved
 
 @app.get("/api/comments")
 async def get_comments(
@@ -157,7 +406,8 @@ async def get_comments(
     Récupérer les commentaires avec filtres optionnels
     """
     try:
-        comments = db.get_comments(
+        comments = await run_in_threadpool(
+            db.get_comments,
             account_id=account_id,
             status=status,
             limit=limit
@@ -175,17 +425,22 @@ async def validate_comment(validation: ValidateComment):
     Valider, rejeter ou modifier un commentaire
     """
     try:
-        comment = db.get_comment(validation.comment_id)
+        comment = await run_in_threadpool(db.get_comment, validation.comment_id)
         if not comment:
             raise HTTPException(status_code=404, detail="Commentaire non trouvé")
         
+        # Réponse encore en cours de génération (API Batch): écrasée à la fin du batch
+        if comment['status'] == 'generating':
+            raise HTTPException(status_code=409, detail="Réponse IA en cours de génération")
+        
         # Mettre à jour le statut
         if validation.action == "validate":
-            db.update_comment_status(validation.comment_id, "validated")
+            await run_in_threadpool(db.update_comment_status, validation.comment_id, "validated")
         elif validation.action == "reject":
-            db.update_comment_status(validation.comment_id, "rejected")
+            await run_in_threadpool(db.update_comment_status, validation.comment_id, "rejected")
         elif validation.action == "modify" and validation.modified_response:
-            db.update_comment_response(
+            await run_in_threadpool(
+                db.update_comment_response,
                 validation.comment_id,
                 validation.modified_response,
                 "validated"
@@ -197,18 +452,28 @@ async def validate_comment(validation: ValidateComment):
             "action": validation.action
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
 @app.post("/api/comments/publish")
-async def publish_comments(publish_data: PublishRequest, background_tasks: BackgroundTasks):
+async def publish_comments(
+    publish_data: PublishRequest,
+    background_tasks: BackgroundTasks,
+    scraper_pool: Optional[ScraperPool] = Depends(get_scraper_pool)
+):
     """
     Publier les commentaires validés sur TikTok
     """
+    if scraper_pool is None:
+        raise HTTPException(status_code=503, detail="Scraper indisponible")
+    
     try:
         # Vérifier que tous les commentaires sont validés
-        comments = db.get_comments_by_ids(publish_data.comment_ids)
+        comments = await run_in_threadpool(db.get_comments_by_ids, publish_data.comment_ids)
         
+        # Les commentaires 'generating' (réponse par défaut provisoire) sont refusés ici aussi
         invalid_comments = [c for c in comments if c['status'] != 'validated']
         if invalid_comments:
             raise HTTPException(
@@ -219,6 +484,7 @@ async def publish_comments(publish_data: PublishRequest, background_tasks: Backg
         # Lancer la publication en arrière-plan
         background_tasks.add_task(
             process_comment_publishing,
+            scraper_pool,
             publish_data.comment_ids,
             publish_data.account_id
         )
@@ -229,46 +495,48 @@ async def publish_comments(publish_data: PublishRequest, background_tasks: Backg
             "comment_count": len(publish_data.comment_ids)
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
-async def process_comment_publishing(comment_ids: List[int], account_id: int):
+async def process_comment_publishing(scraper_pool: ScraperPool, comment_ids: List[int], account_id: int):
     """
     Fonction de traitement en arrière-plan de la publication
     """
-    global scraper
+    # Statuts à enregistrer en une seule transaction: [(comment_id, status), ...]
+    status_updates = []
     
     try:
-        if not scraper:
-            scraper = TikTokScraper()
+        # Attendre un scraper libre dans le pool (rendu avant l'écriture des statuts)
+        async with scraper_pool.acquire() as scraper:
+            # Récupérer les commentaires à publier
+            comments = await run_in_threadpool(db.get_comments_by_ids, comment_ids)
         
-        # Récupérer les commentaires à publier
-        comments = db.get_comments_by_ids(comment_ids)
+            # Publier chaque commentaire
+            success_count = 0
+            for comment in comments:
+                try:
+                    await run_in_threadpool(
+                        scraper.reply_to_comment,
+                        comment['video_url'],
+                        comment['username'],
+                        comment['ai_response']
+                    )
+                    status_updates.append((comment['id'], 'published'))
+                    success_count += 1
+                    print(f"Commentaire publié pour @{comment['username']}")
+                except Exception as e:
+                    print(f"Échec publication pour @{comment['username']}: {e}")
+                    status_updates.append((comment['id'], 'failed'))
         
-        # Publier chaque commentaire
-        success_count = 0
-        for comment in comments:
-            try:
-                scraper.reply_to_comment(
-                    comment['video_url'],
-                    comment['username'],
-                    comment['ai_response']
-                )
-                db.update_comment_status(comment['id'], 'published')
-                success_count += 1
-                print(f"Commentaire publié pour @{comment['username']}")
-            except Exception as e:
-                print(f"Échec publication pour @{comment['username']}: {e}")
-                db.update_comment_status(comment['id'], 'failed')
-        
-        print(f"Publication terminée: {success_count}/{len(comments)} réussies")
+            print(f"Publication terminée: {success_count}/{len(comments)} réussies")
         
     except Exception as e:
         print(f"Erreur lors de la publication: {e}")
     finally:
-        if scraper:
-            scraper.close()
-            scraper = None
+        if status_updates:
+            await run_in_threadpool(db.update_comments_status_bulk, status_updates)
 
 @app.get("/api/accounts")
 async def get_accounts():
@@ -276,7 +544,7 @@ async def get_accounts():
     Récupérer tous les comptes TikTok
     """
     try:
-        accounts = db.get_all_accounts()
+        accounts = await run_in_threadpool(db.get_all_accounts)
         return {"accounts": accounts}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
@@ -287,7 +555,7 @@ async def create_account(account: TikTokAccount):
     Ajouter un nouveau compte TikTok
     """
     try:
-        account_id = db.create_account(account.dict())
+        account_id = await run_in_threadpool(db.create_account, account.model_dump())
         return {
             "status": "success",
             "account_id": account_id,
@@ -302,7 +570,7 @@ async def delete_account(account_id: int):
     Supprimer un compte TikTok
     """
     try:
-        db.delete_account(account_id)
+        await run_in_threadpool(db.delete_account, account_id)
         return {"status": "success", "message": "Compte supprimé"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
@@ -313,7 +581,7 @@ async def toggle_account(account_id: int, active: bool):
     Activer/désactiver un compte
     """
     try:
-        db.update_account_status(account_id, active)
+        await run_in_threadpool(db.update_account_status, account_id, active)
         return {
             "status": "success",
             "account_id": account_id,
@@ -328,7 +596,7 @@ async def get_statistics(account_id: Optional[int] = None):
     Récupérer les statistiques
     """
     try:
-        stats = db.get_statistics(account_id)
+        stats = await run_in_threadpool(db.get_statistics, account_id)
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
@@ -342,7 +610,7 @@ async def export_to_excel(account_id: Optional[int] = None):
         from io import BytesIO
         from fastapi.responses import StreamingResponse
         
-        comments = db.get_comments(account_id=account_id, limit=1000)
+        comments = await run_in_threadpool(db.get_comments, account_id=account_id, limit=1000)
         
         df = pd.DataFrame(comments)
         
@@ -362,22 +630,6 @@ async def export_to_excel(account_id: Optional[int] = None):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur export: {str(e)}")
 
-# ==================== STARTUP/SHUTDOWN ====================
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialisation au démarrage"""
-    print("API TikTok Comment Manager démarrée")
-    db.init_database()
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Nettoyage à l'arrêt"""
-    global scraper
-    if scraper:
-        scraper.close()
-    print("API arrêtée proprement")
-
 # ==================== LANCEMENT ====================
 
 if __name__ == "__main__":
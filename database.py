@@ -2,12 +2,158 @@
 import sqlite3
 import json
 import logging
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
-logging.basicConfig(level=logging.INFO)
+# Ne pas écraser la configuration de l'application hôte (uvicorn, tests...)
+if not logging.getLogger().handlers:
+    logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# ==================== SCHÉMA ====================
+# Tables dépendantes d'un compte: supprimées en cascade avec lui.
+# {table} permet de reconstruire la table lors d'une migration.
+
+_SQL_CREATE_COMMENTS_TABLE = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        video_url TEXT NOT NULL,
+        account_id INTEGER NOT NULL,
+        username TEXT NOT NULL,
+        comment_text TEXT NOT NULL,
+        ai_response TEXT NOT NULL,
+        status TEXT DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (account_id) REFERENCES accounts (id) ON DELETE CASCADE
+    )
+"""
+
+_SQL_CREATE_STATISTICS_TABLE = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        account_id INTEGER NOT NULL,
+        date DATE DEFAULT CURRENT_DATE,
+        comments_scraped INTEGER DEFAULT 0,
+        comments_validated INTEGER DEFAULT 0,
+        comments_published INTEGER DEFAULT 0,
+        FOREIGN KEY (account_id) REFERENCES accounts (id) ON DELETE CASCADE
+    )
+"""
+
+_CASCADE_TABLES = {
+    'comments': _SQL_CREATE_COMMENTS_TABLE,
+    'statistics': _SQL_CREATE_STATISTICS_TABLE,
+}
+
+# ==================== REQUÊTES SQL ====================
+# Chaînes constantes: le cache de requêtes préparées de sqlite3 les réutilise à chaque appel
+
+_SQL_CREATE_ACCOUNT = "INSERT INTO accounts (username, active) VALUES (?, ?)"
+_SQL_GET_ALL_ACCOUNTS = "SELECT * FROM accounts ORDER BY created_at DESC"
+_SQL_GET_ACCOUNT_BY_ID = "SELECT * FROM accounts WHERE id = ?"
+_SQL_UPDATE_ACCOUNT_STATUS = "UPDATE accounts SET active = ? WHERE id = ?"
+_SQL_DELETE_ACCOUNT = "DELETE FROM accounts WHERE id = ?"
+
+_SQL_INSERT_COMMENT = """
+    INSERT INTO comments 
+    (video_url, account_id, username, comment_text, ai_response, status)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+_SQL_GET_COMMENT_BY_ID = "SELECT * FROM comments WHERE id = ?"
+# Liste d'IDs passée en un seul paramètre JSON: même requête préparée quel que soit le nombre d'IDs
+_SQL_GET_COMMENTS_BY_IDS = "SELECT * FROM comments WHERE id IN (SELECT value FROM json_each(?))"
+_SQL_UPDATE_STATUS = """
+    UPDATE comments 
+    SET status = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE id = ?
+"""
+_SQL_UPDATE_RESPONSE = """
+    UPDATE comments 
+    SET ai_response = ?, status = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE id = ?
+"""
+_SQL_DELETE_COMMENT = "DELETE FROM comments WHERE id = ?"
+
+_SQL_INSERT_BATCH = "INSERT INTO openai_batches (batch_id, comment_ids) VALUES (?, ?)"
+_SQL_GET_BATCHES = "SELECT batch_id, comment_ids FROM openai_batches ORDER BY created_at"
+_SQL_DELETE_BATCH = "DELETE FROM openai_batches WHERE batch_id = ?"
+# Réponse d'un batch: uniquement si le commentaire n'a pas été traité entre-temps
+_SQL_COMPLETE_BATCH_RESPONSE = """
+    UPDATE comments 
+    SET ai_response = ?, status = 'pending', updated_at = CURRENT_TIMESTAMP
+    WHERE id = ? AND status = 'generating'
+"""
+# Commentaires 'generating' sans batch enregistré (arrêt entre la soumission et l'enregistrement)
+_SQL_RESET_ORPHANED_GENERATING = """
+    UPDATE comments 
+    SET status = 'pending', updated_at = CURRENT_TIMESTAMP
+    WHERE status = 'generating' AND id NOT IN (
+        SELECT ids.value FROM openai_batches, json_each(openai_batches.comment_ids) AS ids
+    )
+"""
+_SQL_LAST_INSERT_ID = "SELECT last_insert_rowid()"
+_SQL_GET_SEQUENCE = "SELECT seq FROM sqlite_sequence WHERE name = ?"
+_SQL_DELETE_SEQUENCE = "DELETE FROM sqlite_sequence WHERE name = ?"
+_SQL_INSERT_SEQUENCE = "INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)"
+
+# get_comments: une requête par combinaison de filtres (account_id, status)
+_SQL_GET_COMMENTS = {
+    (False, False): "SELECT * FROM comments ORDER BY created_at DESC LIMIT ?",
+    (True, False): "SELECT * FROM comments WHERE account_id = ? ORDER BY created_at DESC LIMIT ?",
+    (False, True): "SELECT * FROM comments WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+    (True, True): "SELECT * FROM comments WHERE account_id = ? AND status = ? ORDER BY created_at DESC LIMIT ?",
+}
+
+# Tous les compteurs en une seule ligne (pivot), sans agrégation côté Python
+_SQL_STATISTICS = """
+    SELECT 
+        COUNT(*) as total,
+        SUM(status = 'generating') as generating,
+        SUM(status = 'pending') as pending,
+        SUM(status = 'validated') as validated,
+        SUM(status = 'rejected') as rejected,
+        SUM(status = 'published') as published,
+        SUM(status = 'failed') as failed
+    FROM comments
+    {account_filter}
+"""
+_SQL_GET_STATISTICS = _SQL_STATISTICS.format(account_filter="")
+_SQL_GET_STATISTICS_BY_ACCOUNT = _SQL_STATISTICS.format(account_filter="WHERE account_id = ?")
+
+_SQL_DAILY_STATISTICS = """
+    SELECT 
+        DATE(created_at) as date,
+        COUNT(*) as total,
+        SUM(CASE WHEN status = 'validated' THEN 1 ELSE 0 END) as validated,
+        SUM(CASE WHEN status = 'published' THEN 1 ELSE 0 END) as published
+    FROM comments
+    WHERE created_at >= datetime('now', ?)
+    {account_filter}
+    GROUP BY DATE(created_at) ORDER BY date DESC
+"""
+_SQL_GET_DAILY_STATISTICS = _SQL_DAILY_STATISTICS.format(account_filter="")
+_SQL_GET_DAILY_STATISTICS_BY_ACCOUNT = _SQL_DAILY_STATISTICS.format(account_filter="AND account_id = ?")
+
+def _rows_to_dicts(cursor: sqlite3.Cursor) -> List[Dict]:
+    """Convertir les lignes d'un curseur en dicts (noms de colonnes lus une seule fois)"""
+    cols = [col[0] for col in cursor.description]
+    return [dict(zip(cols, row)) for row in cursor.fetchall()]
+
+def _row_to_dict(cursor: sqlite3.Cursor) -> Optional[Dict]:
+    """Convertir la première ligne d'un curseur en dict, None si aucune"""
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip([col[0] for col in cursor.description], row))
+
+class _Connection(sqlite3.Connection):
+    """Connexion SQLite référençable par weakref (suivi des connexions de chaque thread)"""
+
 class Database:
     """
     Classe pour gérer la base de données SQLite
@@ -17,15 +163,87 @@ class Database:
     def __init__(self, db_path: str = "tiktok_comments.db"):
         """Initialiser la connexion à la base de données"""
         self.db_path = db_path
-        self.conn = None
-        logger.info(f"Base de données: {db_path}")
+        # Par thread: connexion propre (lectures parallèles en WAL) et transaction en cours
+        self._local = threading.local()
+        # Toutes les connexions ouvertes, pour que close() les ferme quel que soit le thread
+        self._connections = weakref.WeakSet()
+        self._connections_lock = threading.RLock()
+        self._generation = 0  # Incrémenté par close(): les connexions des threads sont à rouvrir
+        self._shared_conn = None  # Base :memory: (une connexion = une base distincte)
+        logger.info("Base de données: %s", db_path)
     
     def get_connection(self):
-        """Obtenir une connexion à la base de données"""
-        if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row  # Pour retourner des dict
-        return self.conn
+        """Obtenir la connexion du thread courant (ouverte au premier appel)"""
+        if self.db_path == ":memory:":
+            if self._shared_conn is None:
+                with self._connections_lock:
+                    if self._shared_conn is None:
+                        self._shared_conn = self._connect()
+            return self._shared_conn
+        
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.generation != self._generation:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.generation = self._generation
+        return conn
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Ouvrir et configurer une nouvelle connexion"""
+        conn = sqlite3.connect(
+            self.db_path, factory=_Connection, cached_statements=256,
+            check_same_thread=False,  # close() peut fermer la connexion d'un autre thread
+            isolation_level=None  # Autocommit: les transactions sont gérées par transaction()
+        )
+        self._configure_connection(conn)
+        
+        with self._connections_lock:
+            self._connections.add(conn)
+        return conn
+    
+    def _configure_connection(self, conn: sqlite3.Connection):
+        """Réglages SQLite pour des écritures fréquentes et des lectures concurrentes"""
+        if self.db_path != ":memory:":
+            # WAL: les lectures ne bloquent plus les écritures (inutile en mémoire)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # En WAL, NORMAL reste sûr et évite un fsync à chaque commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA mmap_size=268435456")  # 256 Mo
+        conn.execute("PRAGMA cache_size=-20000")  # ~20 Mo
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA busy_timeout=5000")
+        # Requis pour ON DELETE CASCADE (désactivé par défaut, réglage par connexion)
+        conn.execute("PRAGMA foreign_keys=ON")
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Regrouper plusieurs écritures dans une seule transaction (un seul commit)
+        
+        Usage:
+            with db.transaction():
+                db.save_comment(...)
+                db.update_comment_status(...)
+        
+        Les appels imbriqués rejoignent la transaction englobante.
+        """
+        conn = self.get_connection()
+        
+        if getattr(self._local, 'in_transaction', False):
+            yield conn
+            return
+        
+        # IMMEDIATE: verrou d'écriture pris dès le début, pas de conflit en cours de route
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.in_transaction = True
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            self._local.in_transaction = False
     
     def init_database(self):
         """Créer les tables si elles n'existent pas"""
@@ -43,48 +261,85 @@ class Database:
         """)
         
         # Table des commentaires
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS comments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                video_url TEXT NOT NULL,
-                account_id INTEGER NOT NULL,
-                username TEXT NOT NULL,
-                comment_text TEXT NOT NULL,
-                ai_response TEXT NOT NULL,
-                status TEXT DEFAULT 'pending',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (account_id) REFERENCES accounts (id)
-            )
-        """)
+        cursor.execute(_SQL_CREATE_COMMENTS_TABLE.format(table="comments"))
         
         # Table des statistiques (optionnel)
+        cursor.execute(_SQL_CREATE_STATISTICS_TABLE.format(table="statistics"))
+        
+        # Batches OpenAI soumis et pas encore récupérés (repris au redémarrage)
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS statistics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                account_id INTEGER NOT NULL,
-                date DATE DEFAULT CURRENT_DATE,
-                comments_scraped INTEGER DEFAULT 0,
-                comments_validated INTEGER DEFAULT 0,
-                comments_published INTEGER DEFAULT 0,
-                FOREIGN KEY (account_id) REFERENCES accounts (id)
+            CREATE TABLE IF NOT EXISTS openai_batches (
+                batch_id TEXT PRIMARY KEY,
+                comment_ids TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
         
+        # Bases créées avant ON DELETE CASCADE (avant la création des index, perdus à la reconstruction)
+        self._migrate_cascade_foreign_keys(conn)
+        
         # Index pour améliorer les performances
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_comments_status 
             ON comments(status)
         """)
         
+        # Filtres account_id/status + tri par date: parcours d'index borné par LIMIT, sans tri
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_comments_account 
-            ON comments(account_id)
+            CREATE INDEX IF NOT EXISTS idx_comments_acct_status_created 
+            ON comments(account_id, status, created_at DESC)
         """)
         
-        conn.commit()
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_comments_created 
+            ON comments(created_at DESC)
+        """)
+        
+        # Couvert par le préfixe account_id de l'index composite
+        cursor.execute("DROP INDEX IF EXISTS idx_comments_account")
+        
+        # Statistiques pour que le planificateur choisisse les nouveaux index
+        cursor.execute("ANALYZE")
         logger.info("Base de données initialisée")
     
+    def _migrate_cascade_foreign_keys(self, conn: sqlite3.Connection):
+        """
+        Migration unique: ajouter ON DELETE CASCADE aux tables existantes
+        
+        SQLite ne sait pas modifier une contrainte: chaque table concernée est
+        recréée, remplie par copie puis renommée, dans une seule transaction.
+        """
+        outdated = [
+            table for table in _CASCADE_TABLES
+            if any(fk[6] != 'CASCADE' for fk in conn.execute(f"PRAGMA foreign_key_list({table})"))
+        ]
+        if not outdated:
+            return
+        
+        # Contrôle des clés étrangères suspendu pendant la reconstruction (sans effet dans une transaction)
+        conn.execute("PRAGMA foreign_keys=OFF")
+        try:
+            with self.transaction():
+                for table in outdated:
+                    columns = ", ".join(col[1] for col in conn.execute(f"PRAGMA table_info({table})"))
+                    conn.execute(_CASCADE_TABLES[table].format(table=f"{table}_new"))
+                    conn.execute(f"INSERT INTO {table}_new ({columns}) SELECT {columns} FROM {table}")
+                    # Compteur AUTOINCREMENT (perdu avec DROP TABLE): les IDs supprimés ne sont pas réattribués
+                    sequence = conn.execute(_SQL_GET_SEQUENCE, (table,)).fetchone()
+                    conn.execute(f"DROP TABLE {table}")
+                    conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+                    if sequence is not None:
+                        conn.execute(_SQL_DELETE_SEQUENCE, (table,))
+                        conn.execute(_SQL_INSERT_SEQUENCE, (table, sequence[0]))
+                
+                orphans = conn.execute("PRAGMA foreign_key_check").fetchall()
+                if orphans:
+                    logger.warning("%s ligne(s) liée(s) à un compte inexistant conservée(s)", len(orphans))
+        finally:
+            conn.execute("PRAGMA foreign_keys=ON")
+        
+        logger.info("Migration ON DELETE CASCADE effectuée: %s", ", ".join(outdated))
+    
     # ==================== GESTION DES COMPTES ====================
     
     def create_account(self, account_data: Dict) -> int:
@@ -98,68 +353,49 @@ class Database:
             int: ID du compte créé
         """
         conn = self.get_connection()
-        cursor = conn.cursor()
         
         try:
-            cursor.execute("""
-                INSERT INTO accounts (username, active)
-                VALUES (?, ?)
-            """, (account_data['username'], account_data.get('active', False)))
+            cursor = conn.execute(
+                _SQL_CREATE_ACCOUNT,
+                (account_data['username'], account_data.get('active', False))
+            )
             
-            conn.commit()
             account_id = cursor.lastrowid
-            logger.info(f"Compte créé: {account_data['username']} (ID: {account_id})")
+            logger.info("Compte créé: %s (ID: %s)", account_data['username'], account_id)
             return account_id
             
         except sqlite3.IntegrityError:
-            logger.error(f"Compte {account_data['username']} existe déjà")
+            logger.error("Compte %s existe déjà", account_data['username'])
             raise ValueError(f"Le compte {account_data['username']} existe déjà")
     
     def get_all_accounts(self) -> List[Dict]:
         """Récupérer tous les comptes"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM accounts ORDER BY created_at DESC")
-        rows = cursor.fetchall()
         
-        return [dict(row) for row in rows]
+        return _rows_to_dicts(conn.execute(_SQL_GET_ALL_ACCOUNTS))
     
     def get_account(self, account_id: int) -> Optional[Dict]:
         """Récupérer un compte par ID"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM accounts WHERE id = ?", (account_id,))
-        row = cursor.fetchone()
         
-        return dict(row) if row else None
+        return _row_to_dict(conn.execute(_SQL_GET_ACCOUNT_BY_ID, (account_id,)))
     
     def update_account_status(self, account_id: int, active: bool):
         """Activer/désactiver un compte"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("""
-            UPDATE accounts 
-            SET active = ? 
-            WHERE id = ?
-        """, (active, account_id))
+        conn.execute(_SQL_UPDATE_ACCOUNT_STATUS, (active, account_id))
         
-        conn.commit()
-        logger.info(f"Compte {account_id} {'activé' if active else 'désactivé'}")
+        logger.info("Compte %s %s", account_id, 'activé' if active else 'désactivé')
     
     def delete_account(self, account_id: int):
         """Supprimer un compte"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        # Supprimer d'abord les commentaires associés
-        cursor.execute("DELETE FROM comments WHERE account_id = ?", (account_id,))
-        cursor.execute("DELETE FROM accounts WHERE id = ?", (account_id,))
+        # Commentaires et statistiques du compte supprimés par ON DELETE CASCADE
+        conn.execute(_SQL_DELETE_ACCOUNT, (account_id,))
         
-        conn.commit()
-        logger.info(f"Compte {account_id} supprimé")
+        logger.info("Compte %s supprimé", account_id)
     
     # ==================== GESTION DES COMMENTAIRES ====================
     
@@ -174,13 +410,8 @@ class Database:
             int: ID du commentaire créé
         """
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("""
-            INSERT INTO comments 
-            (video_url, account_id, username, comment_text, ai_response, status)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
+        cursor = conn.execute(_SQL_INSERT_COMMENT, (
             comment_data['video_url'],
             comment_data['account_id'],
             comment_data['username'],
@@ -189,11 +420,50 @@ class Database:
             comment_data.get('status', 'pending')
         ))
         
-        conn.commit()
         comment_id = cursor.lastrowid
-        logger.info(f"Commentaire sauvegardé (ID: {comment_id})")
+        logger.debug("Commentaire sauvegardé (ID: %s)", comment_id)
         return comment_id
     
+    def save_comments_bulk(self, comments_data: List[Dict]) -> List[int]:
+        """
+        Sauvegarder plusieurs commentaires en une seule transaction
+        
+        Args:
+            comments_data: Liste de {video_url, account_id, username, comment_text, ai_response, status}
+            
+        Returns:
+            List[int]: IDs des commentaires créés (dans l'ordre de comments_data)
+        """
+        if not comments_data:
+            return []
+        
+        rows = [
+            (
+                comment_data['video_url'],
+                comment_data['account_id'],
+                comment_data['username'],
+                comment_data['comment_text'],
+                comment_data['ai_response'],
+                comment_data.get('status', 'pending')
+            )
+            for comment_data in comments_data
+        ]
+        
+        start = time.perf_counter()
+        
+        # Commit unique à la sortie du bloc, rollback en cas d'erreur
+        with self.transaction() as conn:
+            conn.executemany(_SQL_INSERT_COMMENT, rows)
+            
+            # executemany ne renseigne pas lastrowid; les IDs d'une même transaction sont consécutifs
+            last_id = conn.execute(_SQL_LAST_INSERT_ID).fetchone()[0]
+        
+        logger.info(
+            "%s commentaires sauvegardés en %.1f ms",
+            len(rows), (time.perf_counter() - start) * 1000
+        )
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+    
     def get_comments(
         self, 
         account_id: Optional[int] = None,
@@ -212,49 +482,33 @@ class Database:
             List[Dict]: Liste des commentaires
         """
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        query = "SELECT * FROM comments WHERE 1=1"
+        query = _SQL_GET_COMMENTS[(bool(account_id), bool(status))]
         params = []
         
         if account_id:
-            query += " AND account_id = ?"
             params.append(account_id)
         
         if status:
-            query += " AND status = ?"
             params.append(status)
         
-        query += " ORDER BY created_at DESC LIMIT ?"
         params.append(limit)
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        
-        return [dict(row) for row in rows]
+        return _rows_to_dicts(conn.execute(query, params))
     
     def get_comment(self, comment_id: int) -> Optional[Dict]:
         """Récupérer un commentaire par ID"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("SELECT * FROM comments WHERE id = ?", (comment_id,))
-        row = cursor.fetchone()
-        
-        return dict(row) if row else None
+        return _row_to_dict(conn.execute(_SQL_GET_COMMENT_BY_ID, (comment_id,)))
     
     def get_comments_by_ids(self, comment_ids: List[int]) -> List[Dict]:
         """Récupérer plusieurs commentaires par leurs IDs"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        placeholders = ','.join('?' * len(comment_ids))
-        query = f"SELECT * FROM comments WHERE id IN ({placeholders})"
-        
-        cursor.execute(query, comment_ids)
-        rows = cursor.fetchall()
-        
-        return [dict(row) for row in rows]
+        return _rows_to_dicts(
+            conn.execute(_SQL_GET_COMMENTS_BY_IDS, (json.dumps(list(comment_ids)),))
+        )
     
     def update_comment_status(self, comment_id: int, status: str):
         """
@@ -262,19 +516,36 @@ class Database:
         
         Args:
             comment_id: ID du commentaire
-            status: Nouveau statut (pending/validated/rejected/published/failed)
+            status: Nouveau statut (generating/pending/validated/rejected/published/failed)
         """
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("""
-            UPDATE comments 
-            SET status = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (status, comment_id))
+        conn.execute(_SQL_UPDATE_STATUS, (status, comment_id))
         
-        conn.commit()
-        logger.info(f"Commentaire {comment_id} -> {status}")
+        logger.debug("Commentaire %s -> %s", comment_id, status)
+    
+    def update_comments_status_bulk(self, status_updates: List[Tuple[int, str]]):
+        """
+        Mettre à jour le statut de plusieurs commentaires en une seule transaction
+        
+        Args:
+            status_updates: Liste de (comment_id, status)
+        """
+        if not status_updates:
+            return
+        
+        start = time.perf_counter()
+        
+        with self.transaction() as conn:
+            conn.executemany(
+                _SQL_UPDATE_STATUS,
+                [(status, comment_id) for comment_id, status in status_updates]
+            )
+        
+        logger.info(
+            "%s statuts de commentaires mis à jour en %.1f ms",
+            len(status_updates), (time.perf_counter() - start) * 1000
+        )
     
     def update_comment_response(self, comment_id: int, new_response: str, status: str = "validated"):
         """
@@ -286,25 +557,85 @@ class Database:
             status: Nouveau statut
         """
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("""
-            UPDATE comments 
-            SET ai_response = ?, status = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (new_response, status, comment_id))
+        conn.execute(_SQL_UPDATE_RESPONSE, (new_response, status, comment_id))
         
-        conn.commit()
-        logger.info(f"Réponse modifiée pour commentaire {comment_id}")
+        logger.debug("Réponse modifiée pour commentaire %s", comment_id)
     
     def delete_comment(self, comment_id: int):
         """Supprimer un commentaire"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("DELETE FROM comments WHERE id = ?", (comment_id,))
-        conn.commit()
-        logger.info(f"Commentaire {comment_id} supprimé")
+        conn.execute(_SQL_DELETE_COMMENT, (comment_id,))
+        logger.debug("Commentaire %s supprimé", comment_id)
+    
+    # ==================== BATCHES OPENAI ====================
+    
+    def save_batch(self, batch_id: str, comment_ids: List[int]):
+        """
+        Enregistrer un batch OpenAI soumis et les commentaires qu'il traite
+        
+        Args:
+            batch_id: ID du batch OpenAI
+            comment_ids: IDs des commentaires, dans l'ordre des requêtes du batch
+        """
+        conn = self.get_connection()
+        
+        conn.execute(_SQL_INSERT_BATCH, (batch_id, json.dumps(list(comment_ids))))
+        logger.debug("Batch %s enregistré (%s commentaires)", batch_id, len(comment_ids))
+    
+    def get_pending_batches(self) -> List[Dict]:
+        """
+        Récupérer les batches OpenAI dont les réponses n'ont pas encore été sauvegardées
+        
+        Returns:
+            List[Dict]: Liste de {batch_id, comment_ids}
+        """
+        conn = self.get_connection()
+        
+        return [
+            {'batch_id': batch_id, 'comment_ids': json.loads(comment_ids)}
+            for batch_id, comment_ids in conn.execute(_SQL_GET_BATCHES)
+        ]
+    
+    def complete_batch(self, batch_id: str, responses: List[Tuple[int, str]]) -> int:
+        """
+        Sauvegarder les réponses d'un batch et l'oublier, en une seule transaction
+        
+        Seuls les commentaires encore 'generating' reçoivent leur réponse (statut
+        'pending'): ceux validés, rejetés ou supprimés entre-temps sont conservés tels quels.
+        
+        Args:
+            batch_id: ID du batch OpenAI
+            responses: Liste de (comment_id, ai_response)
+            
+        Returns:
+            int: Nombre de commentaires mis à jour
+        """
+        with self.transaction() as conn:
+            updated = conn.executemany(
+                _SQL_COMPLETE_BATCH_RESPONSE,
+                [(ai_response, comment_id) for comment_id, ai_response in responses]
+            ).rowcount
+            conn.execute(_SQL_DELETE_BATCH, (batch_id,))
+        
+        logger.info("Batch %s: %s réponses sauvegardées", batch_id, updated)
+        return updated
+    
+    def reset_orphaned_generating(self) -> int:
+        """
+        Remettre en 'pending' (réponse par défaut) les commentaires 'generating'
+        qu'aucun batch enregistré ne traitera
+        
+        Returns:
+            int: Nombre de commentaires remis en attente
+        """
+        conn = self.get_connection()
+        
+        reset = conn.execute(_SQL_RESET_ORPHANED_GENERATING).rowcount
+        if reset:
+            logger.warning("%s commentaire(s) sans batch OpenAI remis en attente", reset)
+        return reset
     
     # ==================== STATISTIQUES ====================
     
@@ -316,39 +647,17 @@ class Database:
             account_id: Filtrer par compte (optionnel)
             
         Returns:
-            Dict: Statistiques {total, pending, validated, rejected, published}
+            Dict: Statistiques {total, generating, pending, validated, rejected, published}
         """
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        query = "SELECT status, COUNT(*) as count FROM comments"
-        params = []
         
         if account_id:
-            query += " WHERE account_id = ?"
-            params.append(account_id)
-        
-        query += " GROUP BY status"
+            cursor = conn.execute(_SQL_GET_STATISTICS_BY_ACCOUNT, (account_id,))
+        else:
+            cursor = conn.execute(_SQL_GET_STATISTICS)
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        
-        stats = {
-            'total': 0,
-            'pending': 0,
-            'validated': 0,
-            'rejected': 0,
-            'published': 0,
-            'failed': 0
-        }
-        
-        for row in rows:
-            status = row['status']
-            count = row['count']
-            stats[status] = count
-            stats['total'] += count
-        
-        return stats
+        # SUM() renvoie NULL sur une table vide
+        return {key: count or 0 for key, count in _row_to_dict(cursor).items()}
     
     def get_daily_statistics(self, account_id: Optional[int] = None, days: int = 7) -> List[Dict]:
         """
@@ -362,37 +671,49 @@ class Database:
             List[Dict]: Statistiques par jour
         """
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT 
-                DATE(created_at) as date,
-                COUNT(*) as total,
-                SUM(CASE WHEN status = 'validated' THEN 1 ELSE 0 END) as validated,
-                SUM(CASE WHEN status = 'published' THEN 1 ELSE 0 END) as published
-            FROM comments
-            WHERE created_at >= datetime('now', '-' || ? || ' days')
-        """
-        params = [days]
+        window = f"-{int(days)} days"
         
         if account_id:
-            query += " AND account_id = ?"
-            params.append(account_id)
-        
-        query += " GROUP BY DATE(created_at) ORDER BY date DESC"
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
+            cursor = conn.execute(_SQL_GET_DAILY_STATISTICS_BY_ACCOUNT, (window, account_id))
+        else:
+            cursor = conn.execute(_SQL_GET_DAILY_STATISTICS, (window,))
         
-        return [dict(row) for row in rows]
+        return _rows_to_dicts(cursor)
     
     # ==================== CLEANUP ====================
     
+    def maintenance(self):
+        """
+        Maintenance légère, à lancer périodiquement et à la fermeture
+        
+        - Checkpoint du WAL puis troncature du fichier -wal (sinon il grossit
+          tant que des lectures sont en cours)
+        - Mise à jour des statistiques du planificateur (PRAGMA optimize)
+        
+        Les pages libérées par les suppressions ne sont pas rendues au système:
+        lancer VACUUM (ou VACUUM INTO 'copie.db' pour une copie compactée)
+        de temps en temps hors production, car il verrouille toute la base.
+        """
+        conn = self.get_connection()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA optimize")
+    
     def close(self):
-        """Fermer la connexion à la base de données"""
-        if self.conn:
-            self.conn.close()
-            logger.info("Connexion DB fermée")
+        """Fermer les connexions de tous les threads"""
+        with self._connections_lock:
+            if not self._connections:
+                return
+            
+            self.maintenance()
+            
+            connections = list(self._connections)
+            self._connections.clear()
+            self._shared_conn = None
+            self._generation += 1
+        
+        for conn in connections:
+            conn.close()
+        logger.info("Connexions DB fermées (%s)", len(connections))
 
 # Test unitaire
 if __name__ == "__main__":
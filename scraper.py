@@ -1,29 +1,96 @@
 # scraper.py - Module Selenium pour TikTok
+import os
 import time
+import json
+import asyncio
 import logging
+import threading
+from contextlib import asynccontextmanager
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from selenium.webdriver.common.keys import Keys
-import pyperclip
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+from lxml import etree, html as lxml_html
 
-logging.basicConfig(level=logging.INFO)
+# Ne pas écraser la configuration de l'application hôte (uvicorn, tests...)
+if not logging.getLogger().handlers:
+    logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Chargement des commentaires: détecté via les requêtes réseau (CDP) plutôt qu'à l'aveugle
+COMMENT_API_PATH = "/api/comment/list/"
+SCROLL_POLL_INTERVAL = 0.25  # secondes entre deux lectures du journal réseau
+COMMENT_LOAD_QUIET_WINDOW = 0.5  # secondes sans requête de commentaires = chargement terminé
+COMMENT_LOAD_TIMEOUT = 10  # secondes max d'attente par scroll
+SCROLL_FALLBACK_WAIT = 2  # attente fixe si le journal réseau est indisponible
+
+# Blocs de commentaires: HTML récupéré en un seul aller-retour avec les WebElements correspondants
+_COMMENT_BLOCKS_SCRIPT = """
+const blocks = Array.from(
+    document.querySelectorAll("div[class*='DivCommentContentWrapper']")
+).slice(arguments[0]);
+return [blocks, blocks.map(block => block.outerHTML)];
+"""
+
+def _prioritized_xpath(*selectors: str) -> str:
+    """
+    Union XPath équivalente à "premier sélecteur qui trouve quelque chose":
+    chaque branche est ignorée si une branche précédente a des correspondances.
+    Un seul appel WebDriver au lieu d'un essai par sélecteur.
+    """
+    branches = [
+        selector + (f"[not({' | '.join(selectors[:i])})]" if i else "")
+        for i, selector in enumerate(selectors)
+    ]
+    return " | ".join(branches)
+
+# Titre: premier élément non vide, par ordre de priorité
+_VIDEO_TITLE_XPATH = _prioritized_xpath(
+    "//h1[@data-e2e='video-title'][normalize-space()]",
+    "//h1[contains(@class, 'video-meta-title')][normalize-space()]",
+    "//span[@data-e2e='new-desc-span'][normalize-space()]"
+)
+_HASHTAGS_XPATH = _prioritized_xpath(
+    "//a[@data-e2e='browse-video-hashtag']",
+    "//a[contains(@href, '/tag/')]"
+)
+
+# XPath compilées, évaluées localement par lxml (pas d'aller-retour WebDriver)
+_USERNAME_XPATH = etree.XPath(".//div[@data-e2e='comment-username-1']//a")
+_DISPLAY_NAME_XPATH = etree.XPath(".//p[contains(@class, 'TUXText') and contains(@class, 'weight-medium')]")
+_COMMENT_TEXT_XPATH = etree.XPath(".//span[@data-e2e='comment-level-1']/p")
+
+# Chemin du ChromeDriver résolu une seule fois par processus (partagé par tous les scrapers)
+_chromedriver_path = None
+_chromedriver_lock = threading.Lock()
+
+def _get_chromedriver_path() -> str:
+    """Télécharger/localiser ChromeDriver au premier appel, puis réutiliser le chemin"""
+    global _chromedriver_path
+    
+    with _chromedriver_lock:
+        if _chromedriver_path is None or not os.path.exists(_chromedriver_path):
+            from webdriver_manager.chrome import ChromeDriverManager
+            _chromedriver_path = ChromeDriverManager().install()
+        return _chromedriver_path
+
 class TikTokScraper:
     """
     Classe pour scraper et interagir avec TikTok via Selenium
     """
     
+    # Comptes dont les commentaires sont ignorés (comparaison en minuscules, sans espaces autour)
+    _EXCLUDED_USERNAMES = frozenset({"soeur bonplan", "soeur bonplan 🎀"})
+    
     def __init__(self, headless=False):
         """Initialiser le driver Selenium"""
         self.driver = None
         self.video_info = {}
         self.headless = headless
+        self.network_log_enabled = False
         self._init_driver()
     
     def _init_driver(self):
@@ -43,15 +110,34 @@ class TikTokScraper:
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option("useAutomationExtension", False)
         
+        # Pas d'images ni de polices: inutiles au scraping, coûteuses en mémoire et en réseau
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--disable-background-networking")
+        chrome_options.add_argument("--disable-features=Translate,MediaRouter")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.stylesheets": 1,  # CSS requis pour les sélecteurs de classes
+            "profile.managed_default_content_settings.fonts": 2,
+        })
+        
+        # Journal réseau (CDP) pour savoir quand les commentaires ont fini de charger
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        
         # Chemin du ChromeDriver (à adapter selon votre système)
         # Option 1: ChromeDriver local
         # service = Service(executable_path='/path/to/chromedriver')
         
-        # Option 2: Utiliser webdriver-manager (recommandé)
-        from webdriver_manager.chrome import ChromeDriverManager
-        service = Service(ChromeDriverManager().install())
+        # Option 2: Utiliser webdriver-manager (recommandé), chemin mis en cache
+        service = Service(_get_chromedriver_path())
         
         self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.network_log_enabled = True
+        except Exception as e:
+            logger.warning("Journal réseau indisponible, attente fixe après chaque scroll: %s", e)
+        
         logger.info("Driver Selenium initialisé")
     
     def scrape_video(self, video_url: str):
@@ -65,7 +151,7 @@ class TikTokScraper:
             List[dict]: Liste des commentaires avec username et texte
         """
         try:
-            logger.info(f"Scraping de la vidéo: {video_url}")
+            logger.info("Scraping de la vidéo: %s", video_url)
             self.driver.get(video_url)
             
             # Attendre le chargement de la page
@@ -85,48 +171,102 @@ class TikTokScraper:
             # Extraire les commentaires
             comments_data = self._extract_comments()
             
-            logger.info(f"{len(comments_data)} commentaires scrapés")
+            logger.info("%s commentaires scrapés", len(comments_data))
             return comments_data
             
         except Exception as e:
-            logger.error(f"Erreur lors du scraping: {e}")
+            logger.error("Erreur lors du scraping: %s", e)
             raise
     
+    def iter_comment_batches(self, video_url: str, batch_size: int = 25):
+        """
+        Scraper les commentaires d'une vidéo TikTok par lots, au fil du scroll
+        
+        Args:
+            video_url: URL de la vidéo TikTok
+            batch_size: Nombre de commentaires par lot
+            
+        Yields:
+            List[dict]: Lots de commentaires avec username et texte
+        """
+        logger.info("Scraping (par lots) de la vidéo: %s", video_url)
+        self.driver.get(video_url)
+        
+        # Attendre le chargement de la page
+        WebDriverWait(self.driver, 30).until(
+            EC.presence_of_element_located((By.XPATH, "//div[@data-e2e='comment-item']"))
+        )
+        
+        # Extraire les infos de la vidéo (titre, hashtags)
+        self._extract_video_info()
+        
+        # Ouvrir les commentaires si nécessaire
+        self._open_comments_section()
+        
+        comment_container = self._get_comment_container()
+        last_height = self.driver.execute_script("return arguments[0].scrollHeight", comment_container)
+        
+        seen_blocks = 0
+        pending = []
+        total = 0
+        
+        while True:
+            # Extraire uniquement les blocs apparus depuis le dernier scroll
+            comments, block_count = self._extract_new_comments(seen_blocks)
+            pending.extend(comments)
+            seen_blocks += block_count
+            
+            while len(pending) >= batch_size:
+                total += batch_size
+                yield pending[:batch_size]
+                pending = pending[batch_size:]
+            
+            new_height = self._scroll_once(comment_container)
+            if new_height == last_height:
+                break
+            last_height = new_height
+        
+        # Derniers blocs chargés par le dernier scroll
+        comments, _ = self._extract_new_comments(seen_blocks)
+        pending.extend(comments)
+        
+        if pending:
+            total += len(pending)
+            yield pending
+        
+        logger.info("%s commentaires scrapés", total)
+    
+    async def scrape_video_streaming(self, video_url: str, batch_size: int = 25):
+        """
+        Version asynchrone de iter_comment_batches: Selenium tourne dans un
+        thread et chaque lot est rendu dès qu'il est disponible
+        
+        Args:
+            video_url: URL de la vidéo TikTok
+            batch_size: Nombre de commentaires par lot
+            
+        Yields:
+            List[dict]: Lots de commentaires avec username et texte
+        """
+        batches = self.iter_comment_batches(video_url, batch_size)
+        
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            yield batch
+    
     def _extract_video_info(self):
         """Extraire le titre et les hashtags de la vidéo"""
         try:
-            # Titre de la vidéo
-            selectors = [
-                "//h1[@data-e2e='video-title']",
-                "//h1[contains(@class, 'video-meta-title')]",
-                "//span[@data-e2e='new-desc-span']"
-            ]
-            
+            # Titre de la vidéo (sélecteurs combinés en une seule requête)
             video_title = "Unknown Title"
-            for selector in selectors:
-                try:
-                    element = self.driver.find_element(By.XPATH, selector)
-                    video_title = element.text.strip()
-                    if video_title:
-                        break
-                except NoSuchElementException:
-                    continue
+            title_elements = self.driver.find_elements(By.XPATH, _VIDEO_TITLE_XPATH)
+            if title_elements:
+                video_title = title_elements[0].text.strip() or video_title
             
             # Hashtags
-            hashtag_elements = []
-            hashtag_selectors = [
-                "//a[@data-e2e='browse-video-hashtag']",
-                "//a[contains(@href, '/tag/')]"
-            ]
-            
-            for selector in hashtag_selectors:
-                try:
-                    elements = self.driver.find_elements(By.XPATH, selector)
-                    if elements:
-                        hashtag_elements = elements
-                        break
-                except NoSuchElementException:
-                    continue
+            hashtag_elements = self.driver.find_elements(By.XPATH, _HASHTAGS_XPATH)
             
             hashtags = [elem.text.strip() for elem in hashtag_elements]
             
@@ -135,11 +275,11 @@ class TikTokScraper:
                 'hashtags': hashtags
             }
             
-            logger.info(f"Vidéo: {video_title}")
-            logger.info(f"Hashtags: {hashtags}")
+            logger.info("Vidéo: %s", video_title)
+            logger.info("Hashtags: %s", hashtags)
             
         except Exception as e:
-            logger.error(f"Erreur extraction infos vidéo: {e}")
+            logger.error("Erreur extraction infos vidéo: %s", e)
             self.video_info = {'title': 'Unknown', 'hashtags': []}
     
     def _open_comments_section(self):
@@ -150,27 +290,101 @@ class TikTokScraper:
             )
             comments_button.click()
             logger.info("Section commentaires ouverte")
-            time.sleep(2)
+            
+            # Attendre l'affichage de la liste plutôt qu'un délai fixe
+            WebDriverWait(self.driver, 10).until(
+                EC.presence_of_element_located((By.XPATH, "//div[contains(@class, 'DivCommentListContainer')]"))
+            )
         except TimeoutException:
             logger.info("Section commentaires déjà ouverte")
     
+    def _get_comment_container(self):
+        """Attendre et retourner le conteneur de la liste des commentaires"""
+        return WebDriverWait(self.driver, 30).until(
+            EC.presence_of_element_located((By.XPATH, "//div[contains(@class, 'DivCommentListContainer')]"))
+        )
+    
+    def _scroll_once(self, comment_container) -> int:
+        """Scroller la liste des commentaires d'un cran et retourner la nouvelle hauteur"""
+        if self.network_log_enabled:
+            # Ignorer les événements antérieurs au scroll
+            self._read_comment_requests(set())
+        
+        self.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", comment_container)
+        
+        if self.network_log_enabled:
+            self._wait_for_comment_requests()
+        else:
+            time.sleep(SCROLL_FALLBACK_WAIT)
+        
+        return self.driver.execute_script("return arguments[0].scrollHeight", comment_container)
+    
+    def _read_comment_requests(self, in_flight: set) -> bool:
+        """
+        Vider le journal réseau et suivre les requêtes de l'API des commentaires
+        
+        Args:
+            in_flight: IDs des requêtes en cours (mis à jour sur place)
+            
+        Returns:
+            bool: True si une requête de commentaires a été vue
+        """
+        seen = False
+        
+        for entry in self.driver.get_log("performance"):
+            message = entry["message"]
+            if COMMENT_API_PATH not in message and not in_flight:
+                continue
+            
+            event = json.loads(message)["message"]
+            method = event.get("method")
+            params = event.get("params", {})
+            
+            if method == "Network.requestWillBeSent":
+                if COMMENT_API_PATH in params.get("request", {}).get("url", ""):
+                    in_flight.add(params.get("requestId"))
+                    seen = True
+            elif method in ("Network.responseReceived", "Network.loadingFinished", "Network.loadingFailed"):
+                if params.get("requestId") in in_flight:
+                    if method != "Network.responseReceived":
+                        in_flight.discard(params["requestId"])
+                    seen = True
+                elif COMMENT_API_PATH in params.get("response", {}).get("url", ""):
+                    seen = True
+        
+        return seen
+    
+    def _wait_for_comment_requests(self):
+        """Attendre que les requêtes de commentaires déclenchées par le scroll soient terminées"""
+        in_flight = set()
+        start = time.monotonic()
+        last_activity = start
+        
+        while True:
+            time.sleep(SCROLL_POLL_INTERVAL)
+            now = time.monotonic()
+            
+            if self._read_comment_requests(in_flight):
+                last_activity = now
+            
+            if not in_flight and now - last_activity >= COMMENT_LOAD_QUIET_WINDOW:
+                return
+            
+            if now - start >= COMMENT_LOAD_TIMEOUT:
+                logger.warning("Chargement des commentaires toujours en cours après %ss", COMMENT_LOAD_TIMEOUT)
+                return
+    
     def _scroll_to_load_all_comments(self):
         """Scroller pour charger tous les commentaires"""
         try:
-            comment_container = WebDriverWait(self.driver, 30).until(
-                EC.presence_of_element_located((By.XPATH, "//div[contains(@class, 'DivCommentListContainer')]"))
-            )
+            comment_container = self._get_comment_container()
             
             logger.info("Chargement de tous les commentaires...")
             last_height = self.driver.execute_script("return arguments[0].scrollHeight", comment_container)
             
             while True:
-                # Scroller vers le bas
-                self.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", comment_container)
-                time.sleep(2)
-                
-                # Calculer la nouvelle hauteur
-                new_height = self.driver.execute_script("return arguments[0].scrollHeight", comment_container)
+                # Scroller vers le bas et calculer la nouvelle hauteur
+                new_height = self._scroll_once(comment_container)
                 
                 if new_height == last_height:
                     break
@@ -180,83 +394,96 @@ class TikTokScraper:
             logger.info("Tous les commentaires chargés")
             
         except Exception as e:
-            logger.error(f"Erreur lors du scroll: {e}")
+            logger.error("Erreur lors du scroll: %s", e)
     
-    def _extract_comments(self):
+    def _snapshot_comment_blocks(self, start: int = 0):
         """
-        Extraire tous les commentaires de la page
-        Exclut automatiquement les commentaires de "Soeur bonplan"
+        Récupérer en un seul appel les blocs de commentaires chargés et leur HTML
+        
+        Args:
+            start: Index du premier bloc à retourner
+            
+        Returns:
+            Tuple[list, list]: (WebElements, arbres lxml) alignés
+        """
+        elements, fragments = self.driver.execute_script(_COMMENT_BLOCKS_SCRIPT, start)
+        return elements, [lxml_html.fromstring(fragment) for fragment in fragments]
+    
+    @staticmethod
+    def _parse_username(tree) -> str:
+        """Extraire le nom d'utilisateur (ou le display name) d'un bloc parsé"""
+        username = ""
+        
+        username_nodes = _USERNAME_XPATH(tree)
+        if username_nodes:
+            href = username_nodes[0].get("href")
+            if href and "/@" in href:
+                username = "@" + href.split("/@")[-1].split("?")[0]
+            else:
+                username = username_nodes[0].text_content().strip()
+        
+        # Préférer le display name s'il existe
+        display_name_nodes = _DISPLAY_NAME_XPATH(tree)
+        if display_name_nodes:
+            display_name = display_name_nodes[0].text_content().strip()
+            if display_name:
+                username = display_name
+        
+        return username
+    
+    def _extract_new_comments(self, start: int = 0):
+        """
+        Extraire les commentaires des blocs chargés à partir de l'index start
+        
+        Returns:
+            Tuple[List[dict], int]: (commentaires, nombre de blocs parcourus)
         """
         try:
-            comment_blocks = self.driver.find_elements(
-                By.XPATH, 
-                "//div[contains(@class, 'DivCommentContentWrapper')]"
-            )
-            
-            comments_data = []
-            excluded_username = "soeur bonplan "
-            
-            for i, comment_block in enumerate(comment_blocks, 1):
-                try:
-                    # Extraire le nom d'utilisateur
-                    username = ""
-                    try:
-                        username_element = comment_block.find_element(
-                            By.XPATH, 
-                            ".//div[@data-e2e='comment-username-1']//a"
-                        )
-                        href = username_element.get_attribute("href")
-                        if href and "/@" in href:
-                            username = "@" + href.split("/@")[-1].split("?")[0]
-                        else:
-                            username = username_element.text.strip()
-                    except NoSuchElementException:
-                        pass
-                    
-                    # Essayer d'obtenir le display name
-                    try:
-                        display_name_element = comment_block.find_element(
-                            By.XPATH, 
-                            ".//p[contains(@class, 'TUXText') and contains(@class, 'weight-medium')]"
-                        )
-                        display_name = display_name_element.text.strip()
-                        if display_name:
-                            username = display_name
-                    except NoSuchElementException:
-                        pass
-                    
-                    # Extraire le texte du commentaire
-                    comment_text = ""
-                    try:
-                        comment_text_element = comment_block.find_element(
-                            By.XPATH, 
-                            ".//span[@data-e2e='comment-level-1']/p"
-                        )
-                        comment_text = comment_text_element.text.strip()
-                    except NoSuchElementException:
-                        logger.warning(f"Impossible de récupérer le texte du commentaire {i}")
-                        continue
-                    
-                    # Exclure les commentaires de l'utilisateur principal
-                    if username.lower().strip() == excluded_username.lower():
-                        logger.info(f"Commentaire exclu: {username}")
-                        continue
-                    
-                    comments_data.append({
-                        'username': username,
-                        'comment_text': comment_text,
-                        'comment_element': comment_block  # Garder pour la réponse
-                    })
-                    
-                except Exception as e:
-                    logger.error(f"Erreur extraction commentaire {i}: {e}")
-                    continue
-            
-            return comments_data
-            
+            comment_blocks, trees = self._snapshot_comment_blocks(start)
         except Exception as e:
-            logger.error(f"Erreur extraction commentaires: {e}")
-            return []
+            logger.error("Erreur extraction commentaires: %s", e)
+            return [], 0
+        
+        comments_data = []
+        
+        for i, (comment_block, tree) in enumerate(zip(comment_blocks, trees), start + 1):
+            try:
+                username = self._parse_username(tree)
+                
+                # Extraire le texte du commentaire
+                comment_text_nodes = _COMMENT_TEXT_XPATH(tree)
+                if not comment_text_nodes:
+                    logger.warning("Impossible de récupérer le texte du commentaire %s", i)
+                    continue
+                comment_text = comment_text_nodes[0].text_content().strip()
+                
+                # Exclure les commentaires de l'utilisateur principal
+                if username.strip().lower() in self._EXCLUDED_USERNAMES:
+                    logger.debug("Commentaire exclu: %s", username)
+                    continue
+                
+                comments_data.append({
+                    'username': username,
+                    'comment_text': comment_text,
+                    'comment_element': comment_block  # Garder pour la réponse
+                })
+                
+            except Exception as e:
+                logger.error("Erreur extraction commentaire %s: %s", i, e)
+                continue
+        
+        return comments_data, len(comment_blocks)
+    
+    def _extract_comments(self):
+        """
+        Extraire les commentaires de la page
+        Exclut automatiquement les commentaires de "Soeur bonplan"
+        
+        Le HTML des blocs est récupéré en un seul appel puis parsé localement
+        avec lxml, au lieu de plusieurs find_element par commentaire.
+        """
+        comments_data, _ = self._extract_new_comments()
+        return comments_data
     
     def reply_to_comment(self, video_url: str, username: str, reply_text: str):
         """
@@ -271,23 +498,23 @@ class TikTokScraper:
             # Si pas déjà sur la page, y naviguer
             if self.driver.current_url != video_url:
                 self.driver.get(video_url)
-                time.sleep(3)
+                WebDriverWait(self.driver, 30).until(
+                    EC.presence_of_element_located((By.XPATH, "//div[contains(@class, 'DivCommentContentWrapper')]"))
+                )
             
-            # Trouver le commentaire de cet utilisateur
-            comment_blocks = self.driver.find_elements(
-                By.XPATH, 
-                "//div[contains(@class, 'DivCommentContentWrapper')]"
-            )
+            # Trouver le commentaire de cet utilisateur (recherche locale dans le HTML des blocs)
+            comment_blocks, trees = self._snapshot_comment_blocks()
             
             target_comment = None
-            for block in comment_blocks:
-                try:
-                    user_element = block.find_element(By.XPATH, ".//div[@data-e2e='comment-username-1']//a")
-                    if username in user_element.text or username.replace('@', '') in user_element.get_attribute("href"):
-                        target_comment = block
-                        break
-                except:
+            for block, tree in zip(comment_blocks, trees):
+                user_nodes = _USERNAME_XPATH(tree)
+                if not user_nodes:
                     continue
+                user_text = user_nodes[0].text_content()
+                user_href = user_nodes[0].get("href") or ""
+                if username in user_text or username.replace('@', '') in user_href:
+                    target_comment = block
+                    break
             
             if not target_comment:
                 raise Exception(f"Commentaire de {username} non trouvé")
@@ -295,12 +522,11 @@ class TikTokScraper:
             # Cliquer sur le bouton "Répondre"
             reply_button = target_comment.find_element(By.XPATH, ".//button[@data-e2e='reply-button']")
             self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", reply_button)
-            time.sleep(0.5)
+            WebDriverWait(self.driver, 3).until(EC.element_to_be_clickable(reply_button))
             self.driver.execute_script("arguments[0].click();", reply_button)
-            logger.info(f"💬 Bouton répondre cliqué pour @{username}")
-            time.sleep(1)
+            logger.debug("💬 Bouton répondre cliqué pour @%s", username)
             
-            # Trouver le champ de réponse
+            # Trouver le champ de réponse (attente jusqu'à son apparition)
             reply_input_selectors = [
                 "//div[@class='public-DraftEditorPlaceholder-inner' and contains(text(), 'Ajouter une réponse')]/following::div[@contenteditable='true'][1]",
                 "//div[@contenteditable='true' and @role='textbox']"
@@ -322,50 +548,156 @@ class TikTokScraper:
             
             # Entrer la réponse
             self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", reply_input)
-            time.sleep(0.5)
-            self.driver.execute_script("arguments[0].click();", reply_input)
-            time.sleep(0.5)
+            self.driver.execute_script("arguments[0].click(); arguments[0].focus();", reply_input)
             
-            # Utiliser pyperclip pour coller
+            # Insérer le texte d'un coup via CDP (sans presse-papiers, fonctionne en headless)
             try:
-                pyperclip.copy(reply_text)
-                reply_input.send_keys(Keys.CONTROL, 'v')
-            except:
+                self.driver.execute_cdp_cmd("Input.insertText", {"text": reply_text})
+            except Exception:
                 reply_input.send_keys(reply_text)
             
-            logger.info(f"Réponse saisie: {reply_text[:50]}...")
-            time.sleep(2)
+            logger.debug("Réponse saisie: %s...", reply_text[:50])
             
-            # Publier la réponse
-            publish_buttons = self.driver.find_elements(
-                By.XPATH, 
-                "//div[@data-e2e='comment-post' and @role='button' and @aria-disabled='false']"
-            )
-            
-            if len(publish_buttons) >= 2:
-                publish_button = publish_buttons[1]
-                self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", publish_button)
-                time.sleep(1)
-                self.driver.execute_script("arguments[0].click();", publish_button)
-                logger.info(f"Réponse publiée pour @{username}")
-                time.sleep(3)
-            else:
+            # Publier la réponse dès que le bouton est activé
+            try:
+                publish_buttons = WebDriverWait(self.driver, 5).until(
+                    lambda driver: self._enabled_publish_buttons()
+                )
+            except TimeoutException:
                 raise Exception("Bouton publier non trouvé")
             
+            publish_button = publish_buttons[1]
+            self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", publish_button)
+            self.driver.execute_script("arguments[0].click();", publish_button)
+            logger.info("Réponse publiée pour @%s", username)
+            
+            # Attendre que le champ de réponse soit fermé ou vidé (envoi terminé)
+            try:
+                WebDriverWait(self.driver, 5).until(lambda driver: self._reply_input_cleared(reply_input))
+            except TimeoutException:
+                logger.warning("Champ de réponse toujours rempli après publication pour @%s", username)
+            
         except Exception as e:
-            logger.error(f"Erreur lors de la réponse à @{username}: {e}")
+            logger.error("Erreur lors de la réponse à @%s: %s", username, e)
             raise
     
+    def _enabled_publish_buttons(self):
+        """Boutons "Publier" actifs (le 2e est celui de la réponse), ou None s'il en manque"""
+        publish_buttons = self.driver.find_elements(
+            By.XPATH, 
+            "//div[@data-e2e='comment-post' and @role='button' and @aria-disabled='false']"
+        )
+        return publish_buttons if len(publish_buttons) >= 2 else None
+    
+    @staticmethod
+    def _reply_input_cleared(reply_input) -> bool:
+        """True si le champ de réponse a disparu ou a été vidé"""
+        try:
+            return not reply_input.is_displayed() or not reply_input.text.strip()
+        except StaleElementReferenceException:
+            return True
+    
     def get_video_info(self):
         """Retourner les infos de la vidéo actuelle"""
         return self.video_info
     
+    def is_alive(self) -> bool:
+        """Vérifier que le navigateur répond encore (False s'il a planté ou a été fermé)"""
+        try:
+            self.driver.current_url
+            return True
+        except Exception:
+            return False
+    
     def close(self):
         """Fermer le driver Selenium"""
         if self.driver:
             self.driver.quit()
             logger.info("Driver Selenium fermé")
 
+class ScraperPool:
+    """
+    Pool de TikTokScraper pré-démarrés, partagé entre les tâches asyncio
+    
+    Lancer Chrome coûte plusieurs secondes: les navigateurs sont démarrés une
+    fois puis prêtés aux tâches de scraping/publication.
+    
+    Usage:
+        pool = await ScraperPool.create(size=2)
+        async with pool.acquire() as scraper:
+            await asyncio.to_thread(scraper.scrape_video, url)
+    """
+    
+    def __init__(self, scrapers):
+        self._scrapers = list(scrapers)
+        self._queue = asyncio.Queue()
+        for scraper in self._scrapers:
+            self._queue.put_nowait(scraper)
+    
+    @classmethod
+    async def create(cls, size: int, headless: bool = False) -> "ScraperPool":
+        """Démarrer size navigateurs en parallèle (ceux qui échouent sont ignorés)"""
+        results = await asyncio.gather(
+            *(asyncio.to_thread(TikTokScraper, headless=headless) for _ in range(size)),
+            return_exceptions=True
+        )
+        
+        scrapers = []
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("Erreur démarrage scraper: %s", result)
+            else:
+                scrapers.append(result)
+        
+        return cls(scrapers)
+    
+    def __len__(self):
+        return len(self._scrapers)
+    
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        Attendre un scraper libre et le rendre au pool à la sortie du bloc
+        
+        Un scraper dont le navigateur ne répond plus est remplacé par un neuf
+        avant d'être rendu (les erreurs sont souvent interceptées dans le bloc,
+        le navigateur est donc vérifié à chaque retour).
+        """
+        scraper = await self._queue.get()
+        try:
+            yield scraper
+        finally:
+            try:
+                scraper = await self._ensure_alive(scraper)
+            finally:
+                self._queue.put_nowait(scraper)
+    
+    async def _ensure_alive(self, scraper: TikTokScraper) -> TikTokScraper:
+        """Retourner le scraper, ou un remplaçant si son navigateur a planté"""
+        if await asyncio.to_thread(scraper.is_alive):
+            return scraper
+        
+        logger.warning("Navigateur du scraper injoignable, redémarrage...")
+        try:
+            replacement = await asyncio.to_thread(TikTokScraper, headless=scraper.headless)
+        except Exception as e:
+            # Nouvel essai au prochain retour de ce scraper dans le pool
+            logger.error("Erreur redémarrage scraper: %s", e)
+            return scraper
+        
+        try:
+            await asyncio.to_thread(scraper.close)
+        except Exception as e:
+            logger.debug("Fermeture du navigateur planté: %s", e)
+        
+        self._scrapers[self._scrapers.index(scraper)] = replacement
+        return replacement
+    
+    async def close(self):
+        """Fermer tous les navigateurs du pool"""
+        for scraper in self._scrapers:
+            await asyncio.to_thread(scraper.close)
+
 # Test unitaire
 if __name__ == "__main__":
     scraper = TikTokScraper(headless=False)